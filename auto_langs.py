@@ -1,25 +1,198 @@
+"""
+Translates langs/en_US.txt into custom_langs/<language>.txt.
+
+Only keys that are missing or whose english text changed since the last run are sent,
+several strings per request, with a bounded number of requests in flight and a rate
+limit per host. Results are written after every batch, so an interrupted run resumes
+where it stopped.
+
+    python auto_langs.py [--endpoint URL] [--concurrency N] [--rate N] [ru_RU be_BY ...]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-import requests
-from localisation import Lang
+import random
+from urllib.parse import urlsplit
 
+import aiohttp
+
+from localisation import Lang
+from translation import translate_endpoint, translation_cache
 
-original = Lang('en_US')
-max_indent = len(max(original.dictionary.keys(), key=len)) / 4
-if int(max_indent) == max_indent:
-    max_indent += 1
-max_indent = int(max_indent)
-langs = ["ru_RU", "be_BY", "es_ES"]
+default_endpoint = os.environ.get("AUTO_LANGS_ENDPOINT", translate_endpoint)
+default_langs = ["ru_RU", "be_BY", "es_ES"]
 custom_langs = "custom_langs"
-if custom_langs not in os.listdir(): os.mkdir(custom_langs)
-for lang in langs:
-    with open(custom_langs + '/' + lang + '.txt', 'w', encoding="utf-8") as file:
-        for k, v in original.dictionary.items():
-            indent = max_indent - len(k) // 4 + 1
-
-            end = lang[:2]
-            url = f"https://translate.google.com/translate_a/single?client=gtx&sl=auto&tl={end}&dt=t&q={v}"
-            response = requests.get(url)
-            translated = response.json()[0][0][0].capitalize()
-
-            file.write(k + '\t' * indent + translated + '\n')
-            print(translated)
+state_path = custom_langs + "/.state.json"
+separator = "\n"
+
+
+class RateLimiter:
+    """Spaces out requests to the same host by at least 1 / rate seconds"""
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self.next_time = {}
+
+    async def wait(self, host):
+        now = asyncio.get_running_loop().time()
+        start = max(now, self.next_time.get(host, now))
+        self.next_time[host] = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+class Translator:
+    def __init__(self, session, endpoint, concurrency=4, rate=5., retries=4, backoff=.5):
+        self.session = session
+        self.endpoint = endpoint
+        self.host = urlsplit(endpoint).netloc
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def request(self, text, destination):
+        params = {"client": "gtx", "sl": "auto", "tl": destination, "dt": "t", "q": text}
+        async with self.semaphore:
+            await self.limiter.wait(self.host)
+            async with self.session.get(self.endpoint, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+        return "".join(sentence[0] for sentence in data[0] if sentence[0])
+
+    async def translate(self, texts, destination):
+        """Translates a batch of one-line strings in a single request"""
+        for attempt in range(self.retries + 1):
+            try:
+                translated = await self.request(separator.join(texts), destination)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, IndexError, TypeError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** attempt + random.uniform(0, self.backoff))
+        lines = translated.split(separator)
+        if len(lines) != len(texts):
+            if len(texts) == 1:
+                return [translated.strip().capitalize()]
+            # the service merged or split lines, send the halves on their own
+            half = len(texts) // 2
+            first, second = await asyncio.gather(self.translate(texts[:half], destination),
+                                                 self.translate(texts[half:], destination))
+            return first + second
+        return [line.strip().capitalize() for line in lines]
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def read_custom_lang(path):
+    translations = {}
+    if not os.path.exists(path):
+        return translations
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            parts = line.rstrip('\n').split(None, 1)
+            if len(parts) == 2:
+                translations[parts[0]] = parts[1]
+    return translations
+
+
+def write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+class LangJob:
+    """One target language: what is already translated and what still has to be"""
+    def __init__(self, lang, original: Lang, state, max_indent):
+        self.lang = lang
+        self.path = f"{custom_langs}/{lang}.txt"
+        self.original = original
+        self.state = state.setdefault(lang, {})
+        self.max_indent = max_indent
+        self.translations = read_custom_lang(self.path)
+        # values go out with `|` instead of line breaks, the same way lang files store them
+        self.sources = {key: value.replace('\n', '|') for key, value in original.dictionary.items()}
+        self.pending = [key for key, value in self.sources.items()
+                        if key not in self.translations or self.state.get(key) != digest(value)]
+
+    def batches(self, size):
+        for start in range(0, len(self.pending), size):
+            yield self.pending[start:start + size]
+
+    def store(self, keys, translated):
+        for key, text in zip(keys, translated):
+            self.translations[key] = text
+            self.state[key] = digest(self.sources[key])
+
+    def write(self):
+        lines = []
+        for key in self.sources:
+            if key in self.translations:
+                indent = self.max_indent - len(key) // 4 + 1
+                lines.append(key + '\t' * indent + self.translations[key] + '\n')
+        write_atomic(self.path, "".join(lines))
+
+
+async def translate_langs(langs, endpoint=default_endpoint, concurrency=4, rate=5., batch_size=8):
+    original = Lang('en_US')
+    max_indent = len(max(original.dictionary.keys(), key=len)) / 4
+    if int(max_indent) == max_indent:
+        max_indent += 1
+    max_indent = int(max_indent)
+
+    os.makedirs(custom_langs, exist_ok=True)
+    try:
+        with open(state_path, encoding="utf-8") as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        state = {}
+
+    jobs = [LangJob(lang, original, state, max_indent) for lang in langs]
+    timeout = aiohttp.ClientTimeout(total=30, connect=10)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        translator = Translator(session, endpoint, concurrency, rate)
+
+        async def run_batch(job, keys):
+            destination = job.lang[:2]
+            texts = [job.sources[key] for key in keys]
+            results = {}
+            for text in texts:
+                cached = translation_cache.get(text, destination)
+                if cached is not None:
+                    results[text] = cached[0]
+            missing = list(dict.fromkeys(text for text in texts if text not in results))
+            if missing:
+                for text, result in zip(missing, await translator.translate(missing, destination)):
+                    results[text] = result
+                    translation_cache.put(text, destination, result)
+            translated = [results[text] for text in texts]
+            job.store(keys, translated)
+            # saved after every batch, a rerun only sends what is still missing
+            job.write()
+            write_atomic(state_path, json.dumps(state, ensure_ascii=False))
+            translation_cache.save()
+            for text in translated:
+                print(text)
+
+        await asyncio.gather(*(run_batch(job, keys) for job in jobs for keys in job.batches(batch_size)))
+    for job in jobs:
+        job.write()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Creates auto translated lang-files in custom_langs")
+    parser.add_argument("langs", nargs="*", default=default_langs)
+    parser.add_argument("--endpoint", default=default_endpoint)
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=5., help="requests per second to one host")
+    parser.add_argument("--batch", type=int, default=8, help="strings per request")
+    args = parser.parse_args()
+    asyncio.run(translate_langs(args.langs, args.endpoint, args.concurrency, args.rate, args.batch))
+
+
+if __name__ == "__main__":
+    main()
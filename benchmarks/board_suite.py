@@ -0,0 +1,198 @@
+"""
+Times the board's hot paths headless on synthetic boards and compares them with a baseline.
+Every board size runs in its own process, so peak RSS belongs to that size alone.
+Run from the repository root:
+
+    python -m benchmarks.board_suite [--sizes 100 1000] [--save-baseline] [--tolerance 0.25]
+
+Exits with 1 when an operation got slower than the baseline by more than the tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+default_sizes = [100, 1000, 10000, 50000]
+default_baseline = os.path.join("benchmarks", "baseline.json")
+repetitions = 20  # for the per-task operations
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)  # bytes on macOS, KiB elsewhere
+
+
+def write_board(path, size):
+    random.seed(size)
+    words = ["write", "report", "fix", "bug", "call", "plan", "trip", "buy", "milk", "review", "code", "read"]
+    columns = {"0": [], "1": [], "2": []}
+    for i in range(size):
+        columns[str(random.randrange(3))].append({
+            "title": f"{random.choice(words).capitalize()} {random.choice(words)} {i}",
+            "desc": " ".join(random.choices(words, k=12)),
+            "reward": random.choice([None, "coffee", "a walk"]),
+        })
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"lang": "en_US", "api_key": "", "is_light_theme": False, "tasks": columns}, file)
+
+
+def timed(results, name, function, number=1):
+    started = time.perf_counter()
+    for _ in range(number):
+        function()
+    results[name] = (time.perf_counter() - started) / number
+
+
+def run_size(size, storage_backend):
+    """Runs inside the child process, in a scratch copy of the resources"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QMessageBox
+
+    import main
+    from benchmarks.lang_catalog import parse_text
+    from localisation import Lang
+    from storage import create_store
+
+    results = {}
+    app = QApplication.instance() or QApplication([])
+    write_board("data.json", size)
+    storage = create_store(storage_backend)
+    storage.load()  # the sqlite store migrates data.json here, that isn't what is measured
+    storage.close()
+
+    timed(results, "lang_parse", lambda: parse_text("en_US"), 50)
+    main.app = app
+    main.primary_lang = Lang("ru_RU")
+    main.lang = Lang("en_US")
+    main.storage = storage
+    timed(results, "load", lambda: setattr(main, "app_data", storage.load()))
+
+    window = None
+
+    def create_window():
+        nonlocal window
+        window = main.Window()
+        app.processEvents()
+    timed(results, "window_init", create_window)
+    timed(results, "load_all_tasks", window.loader.finish)
+    timed(results, "theme_switch", lambda: (window.on_theme_switch(), app.processEvents()), 10)
+
+    def move():
+        model = window.models[0] if window.models[0].rowCount() else window.models[1]
+        window.move_task_to_n_tiles(model.index(model.rowCount() // 2), 1)
+    timed(results, "move_task", move, repetitions)
+
+    main.show_dialog = lambda *args, **kwargs: QMessageBox.Yes
+
+    def delete():
+        model = max(window.models, key=lambda model: model.rowCount())
+        window.on_delete_task(model.index(model.rowCount() // 2))
+    timed(results, "delete_task", delete, repetitions)
+
+    timed(results, "save_tasks_to_file", window.save_tasks_to_file)
+    timed(results, "autosave", lambda: window.autosave(False))
+    timed(results, "full_save", lambda: storage.compact(main.app_data))
+    window.close()
+    app.processEvents()
+    storage.close()
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def run_in_child(size, storage_backend):
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        for name in ("langs", "icons"):
+            shutil.copytree(os.path.join(root, name), os.path.join(scratch, name))
+        output = os.path.join(scratch, "results.json")
+        env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONPATH=root)
+        subprocess.run([sys.executable, "-m", "benchmarks.board_suite", "--child", str(size),
+                        "--storage", storage_backend, "--output", output],
+                       cwd=scratch, env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(output, encoding="utf-8") as file:
+            return json.load(file)
+
+
+def format_value(name, value):
+    if value is None:
+        return "-"
+    if name == "peak_rss_mb":
+        return f"{value:.1f} MB"
+    return f"{value * 1000:.2f} ms"
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for size, measured in results.items():
+        for name, value in measured.items():
+            expected = baseline.get(size, {}).get(name)
+            if value is None or not expected:
+                continue
+            if value > expected * (1 + tolerance):
+                regressions.append(f"{size} tasks, {name}: {format_value(name, value)} vs "
+                                   f"{format_value(name, expected)} (+{(value / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_table(results):
+    names = list(next(iter(results.values())).keys())
+    sizes = list(results.keys())
+    print(f"{'':20}" + "".join(f"{size + ' tasks':>14}" for size in sizes))
+    for name in names:
+        print(f"{name:20}" + "".join(f"{format_value(name, results[size].get(name)):>14}" for size in sizes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the board's hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=default_sizes)
+    parser.add_argument("--storage", choices=["sqlite", "json"], default="sqlite")
+    parser.add_argument("--baseline", default=default_baseline)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=.25, help="allowed slowdown, 0.25 is 25%%")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(run_size(args.child, args.storage), file)
+        return
+
+    results = {}
+    for size in args.sizes:
+        print(f"{size} tasks...", file=sys.stderr)
+        results[str(size)] = run_in_child(size, args.storage)
+    print_table(results)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nbaseline saved to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"\nno baseline at {args.baseline}, save one with --save-baseline")
+        return
+    with open(args.baseline, encoding="utf-8") as file:
+        regressions = compare(results, json.load(file), args.tolerance)
+    if regressions:
+        print("\nslower than the baseline:")
+        for line in regressions:
+            print("  " + line)
+        sys.exit(1)
+    print("\nno regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
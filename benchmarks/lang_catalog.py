@@ -0,0 +1,37 @@
+"""
+Compares parsing lang files as text with loading their compiled catalogs.
+Run from the repository root: python -m benchmarks.lang_catalog
+"""
+import os
+import timeit
+
+from localisation import Lang
+
+
+def parse_text(language):
+    lang = Lang.__new__(Lang)
+    lang.language = language
+    lang.dictionary = {}
+    lang.with_loaded_lang_file(lang.parse_lang_file)
+    return lang
+
+
+def load_catalog(language):
+    lang = Lang.__new__(Lang)
+    lang.language = language
+    return lang.read_catalog(os.stat(lang.lang_file_path))
+
+
+def main(number=2000):
+    for path in sorted(os.listdir("langs")):
+        if not path.endswith(".txt"):
+            continue
+        language = path[:-4]
+        Lang(language)  # make sure the catalog exists
+        text = timeit.timeit(lambda: parse_text(language), number=number) / number
+        catalog = timeit.timeit(lambda: load_catalog(language), number=number) / number
+        print(f"{language}: text {text * 1e6:8.1f} us   catalog {catalog * 1e6:8.1f} us   x{text / catalog:.1f}")
+
+
+if __name__ == "__main__":
+    main()
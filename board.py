@@ -0,0 +1,397 @@
+from datetime import datetime
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QEvent, QRect, QSize, QObject, QTimer, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen
+from PyQt5.QtWidgets import QStyledItemDelegate, QTableView, QFrame, QAbstractItemView, QStyle, QHeaderView
+
+from icons import icon_cache
+from profiling import timed
+from storage import new_task_id
+
+
+class Task:
+    """Plain task record, the board keeps these instead of widgets"""
+    __slots__ = ("id", "title", "description", "column", "deadline", "reward", "upload_timestamp", "overdue")
+
+    def __init__(self, title, description=None, column=0, deadline=None, reward=None, timestamp=None, task_id=None):
+        self.id = new_task_id() if task_id is None else task_id
+        self.reward = None if reward == '' else reward
+        self.column = column
+        self.deadline = deadline
+        self.description = description
+        self.title = title
+        self.upload_timestamp = datetime.now().strftime("[%H:%M:%S] [%d.%m.%y]") if timestamp is None else timestamp
+        self.overdue = False  # set by the DeadlineScheduler
+
+    def get_dict_form(self):
+        return {
+            "id": self.id,
+            "title": self.title,
+            "desc": self.description,
+            "reward": self.reward,
+            "deadline": self.deadline,
+            "timestamp": self.upload_timestamp
+        }
+
+
+class TaskListModel(QAbstractListModel):
+    """
+    One board column, rows are `Task` records (newest on top).
+    Tasks are stored oldest first, so putting a task on top is an append and doesn't
+    shift the stored positions of the others.
+    """
+    def __init__(self, column, tasks=None, parent=None):
+        super().__init__(parent)
+        self.column = column
+        self._tasks = list(reversed(tasks)) if tasks is not None else []
+        for task in self._tasks:
+            task.column = column
+        self._positions = {}  # task id -> index in self._tasks, valid below self._stale_from
+        self._stale_from = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self.task(index.row())
+        if role == Qt.DisplayRole:
+            return task.title
+        if role == Qt.ToolTipRole:
+            return task.description
+        return None
+
+    def task(self, row) -> Task:
+        return self._tasks[len(self._tasks) - 1 - row]
+
+    def tasks(self):
+        return self._tasks[::-1]
+
+    def row_of(self, task_id) -> int:
+        # positions are renumbered lazily, only from the lowest one that was shifted
+        for position in range(self._stale_from, len(self._tasks)):
+            self._positions[self._tasks[position].id] = position
+        self._stale_from = len(self._tasks)
+        return len(self._tasks) - 1 - self._positions[task_id]
+
+    def insert_task(self, row, task: Task):
+        task.column = self.column
+        position = len(self._tasks) - row
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.insert(position, task)
+        self._stale_from = min(self._stale_from, position)
+        self.endInsertRows()
+
+    def insert_tasks(self, row, tasks):
+        """Inserts tasks (top one first) as one block, so views lay out only once"""
+        if not tasks:
+            return
+        for task in tasks:
+            task.column = self.column
+        position = len(self._tasks) - row
+        self.beginInsertRows(QModelIndex(), row, row + len(tasks) - 1)
+        self._tasks[position:position] = reversed(tasks)
+        self._stale_from = min(self._stale_from, position)
+        self.endInsertRows()
+
+    def append_tasks(self, tasks):
+        """Adds tasks (top one first) under the existing ones"""
+        if not tasks:
+            return
+        for task in tasks:
+            task.column = self.column
+        row = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), row, row + len(tasks) - 1)
+        self._tasks[0:0] = reversed(tasks)
+        self._stale_from = 0
+        self.endInsertRows()
+
+    def remove_tasks(self, rows):
+        """Removes rows in runs of neighbouring ones and returns their tasks top one first"""
+        rows = sorted(set(rows))
+        removed = []
+        while rows:
+            last = rows.pop()
+            first = last
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            start = len(self._tasks) - 1 - last
+            self.beginRemoveRows(QModelIndex(), first, last)
+            block = self._tasks[start:start + last - first + 1]
+            del self._tasks[start:start + last - first + 1]
+            for task in block:
+                self._positions.pop(task.id, None)
+            self._stale_from = min(self._stale_from, start)
+            self.endRemoveRows()
+            removed[:0] = reversed(block)
+        return removed
+
+    def remove_task(self, row) -> Task:
+        position = len(self._tasks) - 1 - row
+        self.beginRemoveRows(QModelIndex(), row, row)
+        task = self._tasks.pop(position)
+        self._positions.pop(task.id, None)
+        self._stale_from = min(self._stale_from, position)
+        self.endRemoveRows()
+        return task
+
+
+class TaskDelegate(QStyledItemDelegate):
+    """Paints a task card and turns clicks on its buttons into signals"""
+    prev_clicked = pyqtSignal(QModelIndex)
+    next_clicked = pyqtSignal(QModelIndex)
+    delete_clicked = pyqtSignal(QModelIndex)
+
+    card_height = 200
+    card_margin = 9
+    max_card_width = 600
+    upper_height = 70
+    lower_height = 50
+    padding = 20
+    icon_names = {
+        "prev": "tile_buttons/arrows/prev",
+        "next": "tile_buttons/arrows/next",
+        "trash": "tile_buttons/trash",
+        "checkmark": "tile_buttons/checkmark",
+    }
+    icon_sizes = {"prev": 40, "next": 40, "trash": 60, "checkmark": 60}
+
+    def __init__(self, theme, parent=None):
+        super().__init__(parent)
+        self.colors = {}
+        self.pixmaps = {}
+        self.no_description = ''
+        theme.changed.connect(self.set_theme)
+        if theme.current is not None:
+            self.set_theme(theme.current)
+
+    def set_theme(self, theme):
+        self.colors = theme.colors
+        # the same pixmaps are shared by every column, nothing is rasterized while painting
+        self.pixmaps = {key: icon_cache.pixmap(name, self.colors["buttons"], self.icon_sizes[key])
+                        for key, name in self.icon_names.items()}
+
+    def set_no_description(self, text):
+        self.no_description = text
+        self.parent().viewport().update()
+
+    def sizeHint(self, option, index):
+        return QSize(200, self.card_height)
+
+    def card_rect(self, rect: QRect) -> QRect:
+        card = rect.adjusted(self.card_margin, self.card_margin, -self.card_margin, -self.card_margin)
+        if card.width() > self.max_card_width:
+            card.setLeft(card.left() + (card.width() - self.max_card_width) // 2)
+            card.setWidth(self.max_card_width)
+        return card
+
+    def sections(self, card: QRect):
+        upper = QRect(card.left(), card.top(), card.width(), self.upper_height)
+        lower = QRect(card.left(), card.bottom() - self.lower_height + 1, card.width(), self.lower_height)
+        description = QRect(card.left(), upper.bottom() + 1, card.width(), lower.top() - upper.bottom() - 1)
+        return upper, description, lower
+
+    def button_rects(self, rect: QRect):
+        upper, _, lower = self.sections(self.card_rect(rect))
+        return {
+            "delete": QRect(upper.right() - 80 + 1, upper.top(), 80, upper.height()),
+            "prev": QRect(lower.left(), lower.top(), lower.height(), lower.height()),
+            "next": QRect(lower.right() - lower.height() + 1, lower.top(), lower.height(), lower.height()),
+        }
+
+    def draw_centered(self, painter, pixmap, rect):
+        painter.drawPixmap(rect.center().x() - pixmap.width() // 2 + 1,
+                           rect.center().y() - pixmap.height() // 2 + 1, pixmap)
+
+    @staticmethod
+    def format_deadline(deadline):
+        try:
+            return "→ " + datetime.fromisoformat(deadline).strftime("[%H:%M] [%d.%m.%y]")
+        except (TypeError, ValueError):
+            return deadline
+
+    def paint(self, painter, option, index):
+        model = index.model()
+        task = model.task(index.row())
+        card = self.card_rect(option.rect)
+        upper, description, lower = self.sections(card)
+        buttons = self.button_rects(option.rect)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.colors["label_center"])
+        painter.drawRoundedRect(card, 5, 5)
+        painter.setBrush(self.colors["label_upper"])
+        painter.drawRoundedRect(upper, 3, 3)
+        painter.setBrush(self.colors["label_lower"])
+        painter.drawRoundedRect(lower, 3, 3)
+        if option.state & QStyle.State_Selected:
+            painter.setBrush(Qt.NoBrush)
+            painter.setPen(QPen(self.colors["buttons"], 2))
+            painter.drawRoundedRect(card, 5, 5)
+
+        painter.setFont(option.font)
+        painter.setPen(self.colors["buttons"])
+        title_rect = upper.adjusted(self.padding, 0, -buttons["delete"].width(), 0)
+        painter.drawText(title_rect, Qt.AlignLeft | Qt.AlignVCenter | Qt.TextWordWrap, task.title)
+        painter.drawText(description.adjusted(self.padding, 5, -self.padding, -5),
+                         Qt.AlignLeft | Qt.AlignTop | Qt.TextWordWrap,
+                         self.no_description if task.description is None else task.description)
+        painter.setPen(Qt.white)
+        if task.deadline is None:
+            painter.drawText(lower, Qt.AlignCenter, task.upload_timestamp)
+        else:
+            painter.drawText(lower.adjusted(0, 4, 0, 0), Qt.AlignHCenter | Qt.AlignTop, task.upload_timestamp)
+            if task.overdue:
+                painter.setPen(self.colors["red"])
+            painter.drawText(lower.adjusted(0, 0, 0, -4), Qt.AlignHCenter | Qt.AlignBottom,
+                             self.format_deadline(task.deadline))
+
+        self.draw_centered(painter, self.pixmaps["checkmark" if model.column == 2 else "trash"], buttons["delete"])
+        self.draw_centered(painter, self.pixmaps["prev"], buttons["prev"])
+        self.draw_centered(painter, self.pixmaps["next"], buttons["next"])
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton:
+            signals = {"prev": self.prev_clicked, "next": self.next_clicked, "delete": self.delete_clicked}
+            for name, rect in self.button_rects(option.rect).items():
+                if rect.contains(event.pos()):
+                    signals[name].emit(QModelIndex(index))
+                    return True
+        return super().editorEvent(event, model, option, index)
+
+
+class TaskListView(QTableView):
+    """
+    A one-column table rather than a QListView: with fixed row heights it only asks the
+    model about visible rows, while QListView touches every row on each relayout.
+    """
+    def __init__(self, model: TaskListModel, theme, parent=None):
+        super().__init__(parent)
+        self.setModel(model)
+        delegate = TaskDelegate(theme, self)
+        self.setItemDelegate(delegate)
+        theme.changed.connect(self.viewport().update)
+
+        self.horizontalHeader().hide()
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.verticalHeader().hide()
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(delegate.card_height)
+        self.setShowGrid(False)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setMinimumWidth(300)
+        self.viewport().setAutoFillBackground(False)
+
+        self.matches = None  # ids of the tasks left visible by the search, None shows all of them
+        self.inserted = None  # rows inserted before the header got sections for them
+        model.rowsInserted.connect(self.on_rows_inserted)
+        self.verticalHeader().sectionCountChanged.connect(self.on_section_count_changed)
+
+    def set_filter(self, matches):
+        """Hides the rows of tasks that aren't in `matches`, the model itself stays as it is"""
+        self.matches = matches
+        if matches is None and not self.verticalHeader().hiddenSectionCount():
+            return
+        self.filter_rows(0, self.model().rowCount() - 1)
+
+    def on_rows_inserted(self, parent, first, last):
+        if self.matches is None:
+            return
+        if self.verticalHeader().count() < self.model().rowCount():
+            # the header shifts the hidden rows once it inserts its sections, filtering now would hit the old rows
+            self.inserted = (first, last)
+            return
+        self.filter_rows(first, last)
+
+    def on_section_count_changed(self, old, new):
+        if self.inserted is not None:
+            first, last = self.inserted
+            self.inserted = None
+            self.filter_rows(first, last)
+
+    def filter_rows(self, first, last):
+        matches = self.matches
+        tasks = self.model().tasks()[first:last + 1]
+        is_hidden = self.verticalHeader().isSectionHidden
+        # every setRowHidden relayouts the header unless updates are off, which makes it slow for many rows
+        self.setUpdatesEnabled(False)
+        for row, task in enumerate(tasks, first):
+            hidden = matches is not None and task.id not in matches
+            if is_hidden(row) != hidden:
+                self.setRowHidden(row, hidden)
+        self.setUpdatesEnabled(True)
+
+
+class BoardLoader(QObject):
+    """
+    Fills the column models from stored task dicts in event-loop sized chunks.
+    The first screenful of every column is loaded right away, the rest streams in
+    after the window is shown.
+    """
+    tasks_loaded = pyqtSignal(list)  # right before the tasks are added to their model, columns already set
+    finished = pyqtSignal()
+
+    first_chunk = 20
+    chunk_size = 600  # per event loop iteration, split between columns
+
+    def __init__(self, models, views, columns, create_task, parent=None):
+        super().__init__(parent)
+        self.models = models
+        self.views = views
+        self.columns = columns  # lists of task dicts, newest first
+        self.create_task = create_task
+        self.loaded = [0] * len(columns)
+        self._timer = QTimer(self, interval=0)
+        self._timer.timeout.connect(self.load_chunk)
+
+    def is_finished(self):
+        return all(loaded == len(dicts) for loaded, dicts in zip(self.loaded, self.columns))
+
+    def load(self, column, count):
+        start = self.loaded[column]
+        dicts = self.columns[column][start:start + count]
+        if not dicts:
+            return
+        tasks = [self.create_task(dictionary) for dictionary in dicts]
+        for task in tasks:
+            task.column = column  # stored dicts don't keep it, tasks_loaded handlers need it
+        self.loaded[column] += len(tasks)
+        self.tasks_loaded.emit(tasks)
+        view = self.views[column]
+        view.setUpdatesEnabled(False)
+        self.models[column].append_tasks(tasks)
+        view.setUpdatesEnabled(True)
+
+    def start(self):
+        for column in range(len(self.columns)):
+            self.load(column, self.first_chunk)
+        if self.is_finished():
+            self.finished.emit()
+        else:
+            self._timer.start()
+
+    @timed
+    def load_chunk(self):
+        left = [column for column, dicts in enumerate(self.columns) if self.loaded[column] < len(dicts)]
+        for column in left:
+            self.load(column, self.chunk_size // len(left))
+        if self.is_finished():
+            self._timer.stop()
+            self.finished.emit()
+
+    def finish(self):
+        """Loads everything that is left right now, needed before the board is saved as a whole"""
+        if self.is_finished():
+            return
+        self._timer.stop()
+        for column, dicts in enumerate(self.columns):
+            self.load(column, len(dicts))
+        self.finished.emit()
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PersistentLRU:
+    """
+    Size-bounded LRU of json values kept in a json file between runs, loaded on first use.
+    With `ttl` entries are stored with their time and expire after `ttl` seconds.
+    store() only marks the cache dirty, the file is rewritten by save().
+    """
+    def __init__(self, path, max_entries, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = None  # OrderedDict, least recently used first; values are [time, value] with a ttl
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # writing the file doesn't hold up lookups
+
+    def load(self):
+        if self.entries is not None:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                self.entries = OrderedDict(json.load(file))
+        except (OSError, ValueError):
+            self.entries = OrderedDict()
+
+    def lookup(self, key):
+        with self.lock:
+            self.load()
+            value = self.entries.get(key)
+            if value is None:
+                return None
+            if self.ttl is not None:
+                if time.time() - value[0] > self.ttl:
+                    del self.entries[key]
+                    self.dirty = True
+                    return None
+                value = value[1]
+            self.entries.move_to_end(key)
+            return value
+
+    def store(self, key, value):
+        with self.lock:
+            self.load()
+            self.entries[key] = value if self.ttl is None else [time.time(), value]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                items = list(self.entries.items())
+                self.dirty = False
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(items, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,89 @@
+import heapq
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+deadline_format = "%Y-%m-%dT%H:%M"  # iso, sorts like the dates it stands for, the sqlite index relies on that
+
+
+def parse_deadline(deadline):
+    """Seconds since the epoch or None for a missing or malformed deadline"""
+    if not deadline:
+        return None
+    try:
+        return datetime.fromisoformat(deadline).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class DeadlineScheduler(QObject):
+    """
+    Min-heap of upcoming deadlines with one single-shot timer armed for the nearest of them.
+    Unscheduled tasks stay in the heap and are skipped when they reach the top, so adding,
+    moving and deleting a task is O(log n) and nothing is ever scanned periodically.
+    """
+    due = pyqtSignal(list)  # tasks whose deadline has come, flagged as overdue
+
+    max_interval = 24 * 3600 * 1000  # QTimer takes an int of milliseconds, far deadlines are approached in steps
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.heap = []  # (deadline, task id)
+        self.scheduled = {}  # task id -> (deadline, task), what the heap entries are checked against
+        self.timer = QTimer(self, singleShot=True)
+        self.timer.timeout.connect(self.fire)
+
+    def __len__(self):
+        return len(self.scheduled)
+
+    def schedule(self, task):
+        deadline = parse_deadline(task.deadline)
+        if deadline is None:
+            self.unschedule(task)
+            return
+        if task.id in self.scheduled and self.scheduled[task.id][0] == deadline:
+            return
+        if task.overdue and deadline <= time.time():
+            return  # already flagged and announced
+        self.scheduled[task.id] = (deadline, task)
+        heapq.heappush(self.heap, (deadline, task.id))
+        if self.heap[0][1] == task.id:
+            self.rearm()
+
+    def unschedule(self, task):
+        task.overdue = False
+        if self.scheduled.pop(task.id, None) is None:
+            return
+        if len(self.heap) > 2 * len(self.scheduled) + 64:
+            # mostly skipped entries, rebuilding is cheaper than dragging them along
+            self.heap = [(deadline, task_id) for task_id, (deadline, _) in self.scheduled.items()]
+            heapq.heapify(self.heap)
+        self.rearm()
+
+    def is_current(self, entry):
+        deadline, task_id = entry
+        scheduled = self.scheduled.get(task_id)
+        return scheduled is not None and scheduled[0] == deadline
+
+    def rearm(self):
+        while self.heap and not self.is_current(self.heap[0]):
+            heapq.heappop(self.heap)
+        if not self.heap:
+            self.timer.stop()
+            return
+        delay = (self.heap[0][0] - time.time()) * 1000
+        self.timer.start(int(min(max(delay, 0), self.max_interval)))
+
+    def fire(self):
+        now = time.time()
+        tasks = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            if self.is_current(entry):
+                task = self.scheduled.pop(entry[1])[1]
+                task.overdue = True
+                tasks.append(task)
+        self.rearm()
+        if tasks:
+            self.due.emit(tasks)
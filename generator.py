@@ -0,0 +1,349 @@
+import json
+import os
+import queue
+import random
+import threading
+
+from PyQt5.QtCore import QObject, QThread, QThreadPool, QRunnable, pyqtSignal
+
+from cache import PersistentLRU
+from lazy import lazy_import
+from translation import translate
+
+openai = lazy_import("openai")
+requests = lazy_import("requests")
+
+# the few-shot part of the prompt never changes, only the topic and the dialog are appended
+prompt_preamble = (
+    "Create a title, description and reward for provided topic, if there is too few information "
+    "provided, you can ask for more using one of this methods: "
+
+    "chooseOption \"Message\" | option that splitted with `|` (you will get number of option "
+    "in answer), getText \"What text you want to get\", "
+    "getTrue \"Binary question with yes or no answers\" and "
+    "endDialog \"message\" if you want to end it, can be used if got unclear commands multiple times."
+
+    "Format answer like: "
+    "\"title, description, reward\".\n\n"
+    "EXAMPLE #1:\n"
+    "Topic: \"Finish my project\"\n"
+    "AI: getText \"What is your project about?\"\n"
+    "Answer: About creating TODO list using python\n"
+    "AI: \"Project finishing, Finish my TODO list project in Python and publish it to github, +1 project in the portfolio\"\n\n"
+    "EXAMPLE #2:\n"
+    "Topic: \"Doing my homework\"\n"
+    "AI: \"Homework, Finish my homework until 22:00, Good mark tomorrow\"\n\n"
+)
+completion_params = {
+    "model": "text-davinci-003",
+    "temperature": 1,
+    "max_tokens": 100,
+    "top_p": 1,
+    "frequency_penalty": 0.5,
+    "presence_penalty": 0,
+    "stop": ["."],
+}
+# a local server speaking the completions protocol, e.g. for offline runs: http://127.0.0.1:8000/v1/completions
+completion_endpoint = os.environ.get("COMPLETION_ENDPOINT")
+# seconds; the read timeout is per chunk when streaming
+timeouts = (float(os.environ.get("AI_CONNECT_TIMEOUT", 3.05)), float(os.environ.get("AI_READ_TIMEOUT", 30)))
+retries = 3
+backoff = .5
+
+
+class Cancelled(Exception):
+    pass
+
+
+def is_transient(exception):
+    if isinstance(exception, requests.HTTPError):
+        return exception.response is not None and (exception.response.status_code == 429
+                                                    or exception.response.status_code >= 500)
+    return isinstance(exception, (requests.ConnectionError, requests.Timeout, openai.error.Timeout,
+                                  openai.error.APIConnectionError, openai.error.APIError,
+                                  openai.error.RateLimitError, openai.error.ServiceUnavailableError,
+                                  openai.error.TryAgain))
+
+
+def retrying(cancelled: threading.Event, function, *args):
+    """Calls `function` again after transient errors, with jittered exponential backoff"""
+    for attempt in range(retries + 1):
+        if cancelled.is_set():
+            raise Cancelled
+        try:
+            return function(*args)
+        except Exception as exception:
+            if attempt == retries or not is_transient(exception):
+                raise
+        # wakes up as soon as the generation is cancelled
+        if cancelled.wait(backoff * 2 ** attempt + random.uniform(0, backoff)):
+            raise Cancelled
+
+
+class OpenAIBackend:
+    def complete(self, prompt):
+        response = openai.Completion.create(prompt=prompt, request_timeout=timeouts, **completion_params)
+        return response["choices"][0]["text"]
+
+    def stream(self, prompt):
+        for chunk in openai.Completion.create(prompt=prompt, stream=True, request_timeout=timeouts,
+                                              **completion_params):
+            yield chunk["choices"][0]["text"]
+
+
+class HTTPBackend:
+    """Posts the same request body as openai does to `endpoint`"""
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.session = requests.Session()
+
+    def complete(self, prompt):
+        response = self.session.post(self.endpoint, json=dict(completion_params, prompt=prompt),
+                                     timeout=timeouts)
+        response.raise_for_status()
+        return response.json()["choices"][0]["text"]
+
+    def stream(self, prompt):
+        """Reads server-sent events, `data: {...}` per chunk and `data: [DONE]` at the end"""
+        with self.session.post(self.endpoint, json=dict(completion_params, prompt=prompt, stream=True),
+                               timeout=timeouts, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                yield json.loads(data)["choices"][0]["text"]
+
+
+backend = HTTPBackend(completion_endpoint) if completion_endpoint else OpenAIBackend()
+
+
+class ResponseCache(PersistentLRU):
+    """
+    Completions keyed by normalized topic and dialog history, so a repeated topic is
+    answered without a request. Entries expire after a week.
+    """
+    def __init__(self, path="generation_cache.json", ttl=7 * 24 * 3600, max_entries=1000):
+        super().__init__(path, max_entries, ttl)
+
+    @staticmethod
+    def key(topic, prev):
+        return '\n'.join([' '.join(topic.lower().split())] + prev)
+
+    def get(self, topic, prev):
+        return self.lookup(self.key(topic, prev))
+
+    def put(self, topic, prev, answer):
+        self.store(self.key(topic, prev), answer)
+
+
+response_cache = ResponseCache()
+
+
+def get_previous_responses(prev):
+    result = ''
+    prefixes = ['AI', 'Answer']
+    for i, response in enumerate(prev):
+        prefix = prefixes[i % 2]
+        result += f'\n{prefix}: {response}'
+    if len(result): result += '\nAI:'
+    return result
+
+
+reply_methods = ["enddialog", "gettext", "gettrue", "chooseoption"]
+
+
+def partial_fields(answer):
+    """
+    [title, description, reward] parsed from the part of an answer received so far,
+    the last ones may be unfinished or missing. None while it can still turn out to be a question.
+    """
+    first_line = answer.lstrip().split('\n')[0]
+    if "ai:".startswith(first_line.lower()):
+        return None  # only the "AI:" prefix so far
+    first_line = first_line.replace("AI:", "").replace('"', "").lstrip()
+    method = first_line.lower()[:max(map(len, reply_methods))]
+    if any(name.startswith(method) or method.startswith(name) for name in reply_methods):
+        return None
+    return first_line.split(',', 2)
+
+
+def stream(prompt, on_token, cancelled):
+    answer = ''
+    for token in backend.stream(prompt):
+        if cancelled.is_set():
+            raise Cancelled  # leaving the loop closes the response
+        answer += token
+        on_token(answer)
+    return answer
+
+
+def ask(topic_en, prev, on_token=None, cancelled=None):
+    """
+    One completion turn, returns (result, parsed data) like OpenAIFetcher.answered.
+    With `on_token` the answer is streamed, it gets the text received so far after every token.
+    Raises Cancelled once `cancelled` is set.
+    """
+    cancelled = threading.Event() if cancelled is None else cancelled
+    try:
+        answer_en = response_cache.get(topic_en, prev)
+        if answer_en is not None and on_token is not None:
+            on_token(answer_en)
+        elif answer_en is None:
+            prompt = prompt_preamble + "Topic: \"{}\"{}".format(topic_en, get_previous_responses(prev))
+            if on_token is None:
+                answer_en = retrying(cancelled, backend.complete, prompt)
+            else:
+                answer_en = retrying(cancelled, stream, prompt, on_token, cancelled)
+            answer_en = answer_en.strip('.').strip()
+            if answer_en:
+                response_cache.put(topic_en, prev, answer_en)
+    except Cancelled:
+        raise
+    except Exception as exception:
+        return str(exception), {}
+
+    print('Proceeding...\t\t', answer_en)
+    if answer_en == '':
+        return 'REJECT', {}
+    data = {}
+    lines = answer_en.split('\n')
+    first_line = lines[0].replace("AI:", "").replace('"', "").strip()
+    prev.append(first_line[4:])
+    for get_method in reply_methods:
+        if first_line.lower().startswith(get_method):  # AI: getText "..."
+            end_index = len(get_method)
+            data['method'] = get_method
+            if get_method == 'chooseoption':
+                split_index = first_line.find("|")
+                data['message'] = first_line[end_index:split_index].strip()
+                data['options'] = first_line[split_index+1:].strip().split('|')
+            else:
+                data['message'] = first_line[end_index:]
+            return 'REPLY', data
+    try:
+        clear_line = first_line.strip().strip('"')
+        title, desc, reward = clear_line.split(',')
+    except ValueError:
+        return f'Unexpected answer: {first_line}', {}
+    data['title'] = title
+    data['desc'] = desc
+    data['reward'] = reward
+    return 'OK', data
+
+
+class OpenAIFetcher(QThread):
+    """
+    Runs a whole generation dialog on its own thread. Every answer is sent to the GUI
+    with `answered`, the GUI replies through `replies` and the thread sleeps on that
+    queue until it does. After cancel() nothing is emitted any more and the thread ends
+    within the request timeouts.
+    """
+    answered = pyqtSignal(str, object)  # 'OK', 'REPLY', 'REJECT' or an error message; parsed data
+    streamed = pyqtSignal(str)  # answer received so far
+
+    def __init__(self, topic='', parent=None):
+        QThread.__init__(self, parent)
+        self.topic = topic
+        self.replies = queue.Queue()  # filled by the GUI thread, None ends the dialog
+        self.cancelled = threading.Event()
+
+    def end_dialog(self):
+        self.replies.put(None)
+
+    def cancel(self):
+        self.cancelled.set()
+        self.end_dialog()
+
+    def on_token(self, answer):
+        if not self.cancelled.is_set():
+            self.streamed.emit(answer)
+
+    def run(self):
+        try:
+            self.dialog()
+        except Cancelled:
+            pass
+
+    def dialog(self):
+        prev = []
+        try:
+            topic_en, original_lang = retrying(self.cancelled, translate, self.topic)
+        except Cancelled:
+            raise
+        except Exception as exception:
+            self.answered.emit(str(exception), {})
+            return
+        while True:
+            result, data = ask(topic_en, prev, self.on_token, self.cancelled)
+            response_cache.save()
+            if self.cancelled.is_set():
+                return
+            self.answered.emit(result, data)
+            if result != 'REPLY':
+                return
+            reply = self.replies.get()
+            if reply is None:
+                return
+            prev.append(reply)
+
+
+class GenerationTask(QRunnable):
+    """Generates a task for one topic of a batch, without asking the user anything"""
+    def __init__(self, batch, topic):
+        super().__init__()
+        self.batch = batch
+        self.topic = topic
+
+    def run(self):
+        try:
+            topic_en, original_lang = retrying(self.batch.cancelled, translate, self.topic)
+            result, data = ask(topic_en, [], cancelled=self.batch.cancelled)
+        except Cancelled:
+            result, data = 'Cancelled', {}
+        except Exception as exception:
+            result, data = str(exception), {}
+        if result == 'REPLY':
+            result = 'Needs more information: ' + data.get('message', '').strip()
+        self.batch.reported.emit(self.topic, result, data)
+
+
+class BatchGenerator(QObject):
+    """Generates tasks for many topics at once, at most `max_in_flight` requests at a time"""
+    generated = pyqtSignal(str, object)  # topic, data with title, desc and reward
+    failed = pyqtSignal(str, str)  # topic, error
+    progress = pyqtSignal(int, int)  # done, total
+    finished = pyqtSignal()
+    reported = pyqtSignal(str, str, object)  # emitted from pool threads
+
+    def __init__(self, topics, max_in_flight=4, parent=None):
+        super().__init__(parent)
+        self.topics = topics
+        self.done = 0
+        self.cancelled = threading.Event()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_in_flight)
+        self.reported.connect(self.on_reported)
+
+    def start(self):
+        for topic in self.topics:
+            self.pool.start(GenerationTask(self, topic))
+
+    def cancel(self):
+        self.cancelled.set()  # every topic that isn't finished yet reports 'Cancelled'
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def on_reported(self, topic, result, data):
+        self.done += 1
+        if result == 'OK':
+            self.generated.emit(topic, data)
+        else:
+            self.failed.emit(topic, result)
+        self.progress.emit(self.done, len(self.topics))
+        if self.done == len(self.topics):
+            response_cache.save()  # once per batch, the workers don't wait on each other's writes
+            self.finished.emit()
@@ -0,0 +1,35 @@
+from PyQt5.QtGui import QIcon, QPainter, QPixmap
+
+
+class IconCache:
+    """
+    Svg icons rasterized and tinted once per (name, color, size) and shared by every
+    widget and delegate that draws them. Cleared when the theme changes.
+    """
+    def __init__(self, root="icons"):
+        self.root = root
+        self._pixmaps = {}
+
+    def pixmap(self, name, color, size) -> QPixmap:
+        key = (name, color.rgba(), size)
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            pixmap = QIcon(f"{self.root}/{name}.svg").pixmap(size, size)
+            painter = QPainter(pixmap)
+            painter.setCompositionMode(QPainter.CompositionMode_SourceIn)
+            painter.fillRect(pixmap.rect(), color)
+            painter.end()
+            self._pixmaps[key] = pixmap
+        return pixmap
+
+    def icon(self, name, color, size) -> QIcon:
+        return QIcon(self.pixmap(name, color, size))
+
+    def clear(self):
+        self._pixmaps.clear()
+
+    def __len__(self):
+        return len(self._pixmaps)
+
+
+icon_cache = IconCache()
@@ -1,17 +1,83 @@
+import functools
+import hashlib
+import json
+import marshal
+import os
+import weakref
+
+catalog_dir = "langs/.cache"
+catalog_version = 1
+
+
 class Lang:
     def __init__(self, language):
         self.language = language
         self.dictionary = {}
+        self.bindings = {}  # (id(target), setter) -> (weakref to target, setter, code, transform)
+
+        self.load()
 
-        self.with_loaded_lang_file(self.parse_lang_file)
+    @property
+    def lang_file_path(self):
+        return "langs/" + self.language + ".txt"
+
+    @property
+    def catalog_path(self):
+        return f"{catalog_dir}/{self.language}.cat"
+
+    def load(self):
+        self.dictionary = {}
+        try:
+            stat = os.stat(self.lang_file_path)
+        except FileNotFoundError:
+            raise ValueError(f"Language \"{self.language}\" doesn't have it's lang file!")
+        dictionary = self.read_catalog(stat)
+        if dictionary is None:
+            self.with_loaded_lang_file(self.parse_lang_file)
+            self.write_catalog(stat)
+        else:
+            self.dictionary = dictionary
 
     def with_loaded_lang_file(self, function_with):
         try:
-            with open("langs/" + self.language + ".txt", encoding="utf-8") as file:
+            with open(self.lang_file_path, encoding="utf-8") as file:
                 function_with(file)
         except FileNotFoundError:
             raise ValueError(f"Language \"{self.language}\" doesn't have it's lang file!")
 
+    def source_digest(self):
+        with open(self.lang_file_path, "rb") as file:
+            return hashlib.sha1(file.read()).digest()
+
+    def read_catalog(self, stat):
+        """Returns the compiled dictionary if it still matches the lang file, None otherwise"""
+        try:
+            with open(self.catalog_path, "rb") as file:
+                version, mtime, size, digest, dictionary = marshal.loads(file.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != catalog_version:
+            return None
+        if (mtime, size) == (stat.st_mtime_ns, stat.st_size):
+            return dictionary
+        # touched but maybe not changed (checkout, copy), the hash decides
+        if digest != self.source_digest():
+            return None
+        self.write_catalog(stat, dictionary, digest)
+        return dictionary
+
+    def write_catalog(self, stat, dictionary=None, digest=None):
+        dictionary = self.dictionary if dictionary is None else dictionary
+        digest = self.source_digest() if digest is None else digest
+        tmp_path = self.catalog_path + ".tmp"
+        try:
+            os.makedirs(catalog_dir, exist_ok=True)
+            with open(tmp_path, "wb") as file:
+                marshal.dump((catalog_version, stat.st_mtime_ns, stat.st_size, digest, dictionary), file)
+            os.replace(tmp_path, self.catalog_path)
+        except OSError:
+            pass  # read-only install, parsing the text file every time still works
+
     def parse_lang_file(self, file):
         lines = file.readlines()
         self.dictionary["language"] = lines[0][:-1]
@@ -30,7 +96,34 @@ class Lang:
 
     def set_language(self, new_language):
         self.language = new_language
-        self.with_loaded_lang_file(self.parse_lang_file)
+        self.load()
+        self.retranslate()
+
+    def bind(self, target, setter, code, transform=None):
+        """Calls target.setter(text) now and again every time the language changes"""
+        key = (id(target), setter)
+        self.bindings[key] = (weakref.ref(target, functools.partial(self.unbind, key)), setter, code, transform)
+        self.apply_binding(target, setter, code, transform)
+
+    def unbind(self, key, target_ref):
+        """Drops the binding of a target that is gone, unless its id was bound again since"""
+        binding = self.bindings.get(key)
+        if binding is not None and binding[0] is target_ref:
+            del self.bindings[key]
+
+    def apply_binding(self, target, setter, code, transform):
+        text = self[code]
+        getattr(target, setter)(text if transform is None else transform(text))
+
+    def retranslate(self):
+        for key, (target_ref, setter, code, transform) in list(self.bindings.items()):
+            target = target_ref()
+            try:
+                if target is None:
+                    raise RuntimeError
+                self.apply_binding(target, setter, code, transform)
+            except RuntimeError:  # target (or the Qt object behind it) is gone
+                del self.bindings[key]
 
     def __getitem__(self, item) -> str:
         try:
@@ -42,6 +135,68 @@ class Lang:
         return result
 
 
+class LanguageIndex:
+    """
+    Code, name and key count of every installed language, kept in langs/.cache/index.json.
+    A lang file is only loaded again when its mtime or size changes.
+    """
+    def __init__(self, path=catalog_dir + "/index.json"):
+        self.path = path
+        self.languages = None  # code -> {"name", "keys", "mtime", "size"}
+
+    def read(self):
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def write(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(self.languages, file, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def refresh(self):
+        if self.languages is None:
+            self.languages = self.read()
+        changed = False
+        found = set()
+        for entry in os.scandir("langs"):
+            if not entry.name.endswith(".txt"):
+                continue
+            code = entry.name[:-4]
+            found.add(code)
+            stat = entry.stat()
+            known = self.languages.get(code)
+            if known is not None and (known["mtime"], known["size"]) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            lang = Lang(code)
+            self.languages[code] = {"name": lang["language"], "keys": len(lang.dictionary),
+                                    "mtime": stat.st_mtime_ns, "size": stat.st_size}
+            changed = True
+        for code in set(self.languages) - found:
+            del self.languages[code]
+            changed = True
+        if changed:
+            self.write()
+
+    def entries(self, primary: Lang = None):
+        """[(code, name, coverage in percents against primary)]"""
+        self.refresh()
+        primary_count = len(primary.dictionary) if primary is not None else None
+        return [(code, info["name"],
+                 round(info["keys"] / primary_count * 100, 2) if primary_count else 100.0)
+                for code, info in self.languages.items()]
+
+
+language_index = LanguageIndex()
+
+
 if __name__ == "__main__":
     new_lang = Lang("ru_RU")  # load russian lang
 
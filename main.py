@@ -1,42 +1,28 @@
-import json
 import os
 import sys
+import time
 from datetime import datetime
 
-import openai
-import requests
-from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import Qt, QSize, QTimer, QThread
+started = time.perf_counter()
+
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import Qt, QSize, QTimer, QDateTime
 from PyQt5.QtGui import QIcon, QFont
 from PyQt5.QtWidgets import QApplication, QWidget, QToolTip, QPushButton, QMessageBox, QLabel, \
-    QInputDialog, QScrollArea, QFrame, QVBoxLayout, QSizePolicy, QGridLayout, QTextEdit, QLineEdit, QDialog, QHBoxLayout
-from localisation import Lang
-from toast import QToaster
-
-color_schemes = {
-    "dark": {
-        "buttons": "ffffff",
-        "background": "303138",
-        "foreground": "3C4A4A",
-        "red": "E62763",
-        "green": "60F029",
-
-        "label_lower": "0D4F42",
-        "label_center": "289C85",
-        "label_upper": "287062"
-    },
-    "light": {
-        "buttons": "222222",
-        "background": "E8E7C9",
-        "foreground": "DBDBC3",
-        "red": "E62763",
-        "green": "60F029",
-
-        "label_lower": "B000E6",
-        "label_center": "BB4FDB",
-        "label_upper": "D342FF"
-    },
-}
+    QInputDialog, QGridLayout, QTextEdit, QLineEdit, QDialog, QFileDialog, QProgressDialog, QCheckBox, QDateTimeEdit
+from board import Task, TaskListModel, TaskListView, BoardLoader
+from deadlines import DeadlineScheduler, deadline_format
+from search import SearchIndex
+from generator import OpenAIFetcher, BatchGenerator, partial_fields, timeouts
+from icons import icon_cache
+from lazy import lazy_import
+from localisation import Lang, language_index
+from profiling import timed, install as install_profiling
+from storage import create_store, BackgroundSaver
+from themes import ThemeManager
+from toast import ToastManager
+
+openai = lazy_import("openai")
 
 
 def show_dialog(title: str, subtitle: str = '', icon=QMessageBox.Information, buttons=QMessageBox.Ok, default_button=0):
@@ -50,267 +36,76 @@ def show_dialog(title: str, subtitle: str = '', icon=QMessageBox.Information, bu
     return msgBox.exec()
 
 
-def translate(text, destination='en'):
-    url = f"https://translate.google.com/translate_a/single?client=gtx&sl=auto&tl={destination}&dt=t&q={text}"
-    response = requests.get(url)
-    translated = response.json()[0][0][0].capitalize()
-    language = response.json()[2]
-    return translated, language
-
-
-class AllowToProceed(Exception):
-    def __init__(self, message: str = ''):
-        self.txt = message
-
-
-class TaskLabel(QWidget):
-    def __init__(self, title, description=None, column=0, deadline=None, reward=None, timestamp=None):
-        super().__init__()
-
-        self.reward = None if reward == '' else reward
-        self.column = column
-        self.deadline = deadline
-        self.description = lang["gui.tasks.labels.no_desc"] if description is None else description
-        self.title = title
-        self.upload_timestamp = datetime.now().strftime("[%H:%M:%S] [%d.%m.%y]") if timestamp is None else timestamp
-
-        self.background_rect = QFrame()
-        self.lower_frame = QFrame()
-        self.upper_frame = QFrame()
-        self.title_label = QLabel(self.title)
-        self.desc_label = QLabel(self.description)
-        self.timestamp_label = QLabel(self.upload_timestamp)
-
-        self.prev_button = QPushButton()
-        self.next_button = QPushButton()
-        self.del_button = QPushButton()
-
-        self.setup_widgets()
-        # self.setup_layouts()
-
-    def setup_widgets(self):
-        # Create a black rect widget
-        self.background_rect.setAutoFillBackground(False)
-        self.background_rect.setStyleSheet("background-color: #805CFF; padding: 10px 20px; border-radius: 5px;")
-        self.background_rect.setMaximumWidth(600)
-        self.background_rect.setMinimumSize(200, 100)
-
-        main_layout = QVBoxLayout()
-        upper_layout = QHBoxLayout()
-        lower_layout = QGridLayout()
-
-        self.title_label.setWordWrap(True)
-        self.title_label.setTextInteractionFlags(Qt.TextSelectableByMouse | Qt.TextSelectableByKeyboard)
-
-        self.desc_label.setTextInteractionFlags(Qt.TextSelectableByMouse | Qt.TextSelectableByKeyboard)
-        self.desc_label.setMinimumWidth(200)
-        self.desc_label.setWordWrap(True)
-
-        self.timestamp_label.setTextInteractionFlags(Qt.TextSelectableByMouse | Qt.TextSelectableByKeyboard)
-        self.timestamp_label.setStyleSheet('color: white')
-        self.timestamp_label.setMinimumSize(150, 50)
-
-        self.del_button.setIcon(QIcon("icons/tile_buttons/trash.svg"))
-        self.next_button.setIcon(QIcon("icons/tile_buttons/arrows/next.svg"))
-        self.prev_button.setIcon(QIcon("icons/tile_buttons/arrows/prev.svg"))
-
-        ico_size = 40
-        self.next_button.setIconSize(QSize(ico_size, ico_size))
-        self.prev_button.setIconSize(QSize(ico_size, ico_size))
-        self.del_button.setIconSize(QSize(ico_size * 2, ico_size * 2))
-
-        self.next_button.setStyleSheet("background: transparent;")
-        self.prev_button.setStyleSheet("background: transparent;")
-        self.del_button.setStyleSheet("background: transparent;")
-
-        self.del_button.setFixedWidth(80)
-
-        lower_layout.addWidget(self.prev_button, 0, 0, alignment=Qt.AlignLeft)
-        lower_layout.addWidget(self.timestamp_label, 0, 1, alignment=Qt.AlignCenter)
-        lower_layout.addWidget(self.next_button, 0, 2, alignment=Qt.AlignRight)
-
-        upper_layout.addWidget(self.title_label)
-        upper_layout.addWidget(self.del_button)
-
-        self.upper_frame.setMinimumHeight(70)
-        self.upper_frame.setMaximumHeight(200)
-        self.upper_frame.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
-        self.upper_frame.setStyleSheet("background-color: #6940F7; border-radius: 3px;")
-        self.upper_frame.setLayout(upper_layout)
-
-        self.lower_frame.setFixedHeight(50)
-        self.lower_frame.setStyleSheet("background-color: #3B1BAB; border-radius: 3px;")
-        lower_layout.setContentsMargins(0, 0, 0, 0)
-        self.lower_frame.setContentsMargins(0, 0, 0, 0)
-        self.lower_frame.setLayout(lower_layout)
-
-        main_layout.addWidget(self.upper_frame)
-        main_layout.addWidget(self.desc_label, alignment=Qt.AlignLeft | Qt.AlignTop)
-        main_layout.addWidget(self.lower_frame)
-
-        parent_layout = QVBoxLayout()
-
-        # Add the grid layout to the rect widget
-        self.background_rect.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
-        self.background_rect.setLayout(main_layout)
-
-        # Add the rect widget to the parent layout
-        parent_layout.addWidget(self.background_rect)
-        self.background_rect.setContentsMargins(0, 0, 0, 0)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-        self.background_rect.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        # Assign the parent layout to the parent widget
-        self.setLayout(parent_layout)
-
-    def get_dict_form(self):
-        return {
-            "title": self.title,
-            "desc": self.description,
-            "reward": self.reward,
-            "deadline": self.deadline,
-            "timestamp": self.upload_timestamp
-        }
-
-
-class OpenAIFetcher(QThread):
-    def __init__(self):
-        QThread.__init__(self)
-        self.data = {}
-        self.topic = ''
-        self.result = 'OK'
-        self.prev = []
-
-    def get_previous_responses(self):
-        result = ''
-        prefixes = ['AI', 'Answer']
-        for i, response in enumerate(self.prev):
-            prefix = prefixes[i % 2]
-            result += f'\n{prefix}: {response}'
-        if len(result): result += '\nAI:'
-        return result
-
-    def run(self):
-        try:
-            topic_en, original_lang = translate(self.topic)
-            prompt = ("Create a title, description and reward for provided topic, if there is too few information "
-                      "provided, you can ask for more using one of this methods: "
-                      
-                      "chooseOption \"Message\" | option that splitted with `|` (you will get number of option "
-                      "in answer), getText \"What text you want to get\", "
-                      "getTrue \"Binary question with yes or no answers\" and "
-                      "endDialog \"message\" if you want to end it, can be used if got unclear commands multiple times."
-                      
-                      "Format answer like: "
-                      "\"title, description, reward\".\n\n"
-                      "EXAMPLE #1:\n"
-                      "Topic: \"Finish my project\"\n"
-                      "AI: getText \"What is your project about?\"\n"
-                      "Answer: About creating TODO list using python\n"
-                      "AI: \"Project finishing, Finish my TODO list project in Python and publish it to github, +1 project in the portfolio\"\n\n"
-                      "EXAMPLE #2:\n"
-                      "Topic: \"Doing my homework\"\n"
-                      "AI: \"Homework, Finish my homework until 22:00, Good mark tomorrow\"\n\n"
-                      "Topic: \"{}\"{}".format(topic_en, self.get_previous_responses()))
-            response = openai.Completion.create(
-                model="text-davinci-003",
-                prompt=prompt,
-                temperature=1,
-                max_tokens=100,
-                top_p=1,
-                frequency_penalty=0.5,
-                presence_penalty=0,
-                stop=["."]
-            )
-            answer_en = response["choices"][0]["text"]
-            answer_en = answer_en.strip('.').strip()
-        except Exception as exception:
-            self.result = str(exception)
-        else:
-            try:
-                while x.busy: pass
-                print('Proceeding...\t\t', answer_en)
-                if answer_en == '':
-                    self.result = 'REJECT'
-                    raise AllowToProceed
-                self.data = {}
-                lines = answer_en.split('\n')
-                first_line = lines[0].replace("AI:", "").replace('"', "").strip()
-                self.prev.append(first_line[4:])
-                for get_method in ["enddialog", "gettext", "gettrue", "chooseoption"]:
-                    if first_line.lower().startswith(get_method):  # AI: getText "..."
-                        end_index = len(get_method)
-                        self.data['method'] = get_method
-                        if get_method == 'chooseoption':
-                            split_index = first_line.find("|")
-                            self.data['message'] = first_line[end_index:split_index].strip()
-                            self.data['options'] = first_line[split_index+1:].strip().split('|')
-                        else:
-                            self.data['message'] = first_line[end_index:]
-                        self.result = 'REPLY'
-                        raise AllowToProceed
-                else:
-                    try:
-                        clear_line = first_line.strip().strip('"')
-                        title, desc, reward = clear_line.split(',')
-                        self.data['title'] = title
-                        self.data['desc'] = desc
-                        self.data['reward'] = reward
-                        self.result = 'OK'
-                    except Exception:
-                        pass
-            except AllowToProceed:
-                pass
-
-
 class Window(QWidget):
     def __init__(self):
         super().__init__()
-        self.busy = False
-        self.fetch = OpenAIFetcher()
+        self.fetch = OpenAIFetcher(parent=self)
+        self.batches = []
+        self.streamed_form = None  # form opened by the first tokens of the current answer
+        self.waiting = None
+        self.dirty = False
+        self.startup_report = bool(os.environ.get("STARTUP_REPORT"))  # set by `--importtime`
+        self.saver = BackgroundSaver(storage, self)
+        self.saver.start()
         self.autosaver = QTimer()
         self.autosaver.timeout.connect(self.autosave)
         self.autosaver.start(30000)
 
-        self.toaster = QToaster()
+        self.toaster = ToastManager(self)
         self.dark_mode = app_data["is_light_theme"]
+        self.theme = ThemeManager(parent=self)
+        self.setObjectName("board")
+        self.setAttribute(Qt.WA_StyledBackground)
         QToolTip.setFont(QFont("Aubrey Pro", 20))
 
-        self.setWindowTitle(lang["gui.titles.main_window"])
+        lang.bind(self, "setWindowTitle", "gui.titles.main_window")
         self.setWindowIcon(QIcon("icons/title_ico.png"))
         self.setGeometry(500, 200, 1000, 500)
 
         self.grid_layout = QGridLayout()
+        self.models = []
+        self.views = []
+        self.task_index = {}  # task id -> Task, the column is kept on the task itself
+        self.search_index = SearchIndex()
+        self.deadlines = DeadlineScheduler(self)
+        self.deadlines.due.connect(self.on_deadlines_due)
+        self.matches = None  # shared with the views, new tasks that match the query are added to it
 
         buttons_layout = QGridLayout()
         button_icons = ["add_task", "change_language", "auto_generate"]
         button_functions = [self.show_form_for_add_task, self.change_lang, self.on_auto_generate_click]
         button_icon_sizes = [75, 75, 75]
         self.right_buttons = []
+        self.button_icons = {}  # button -> icon name, icons are tinted for the theme in on_theme_switch
         for i, icon_name in enumerate(button_icons):
             ico_size = button_icon_sizes[i]
-            icon = QIcon(f"icons/tile_buttons/{icon_name}.svg")
-            # icon.actualSize(QSize(100, 100))
 
             self.right_buttons.append(QPushButton(self))
             self.right_buttons[i].setIconSize(QSize(ico_size, ico_size))
-            self.right_buttons[i].setStyleSheet("background-color: rgba(0, 0, 0, 5);border: none;")
-            self.right_buttons[i].setToolTip(lang[f"tooltips.{icon_name}"])
-            self.right_buttons[i].setIcon(icon)
+            self.right_buttons[i].setObjectName("tool_button")
+            lang.bind(self.right_buttons[i], "setToolTip", f"tooltips.{icon_name}")
+            self.button_icons[self.right_buttons[i]] = f"tile_buttons/{icon_name}"
             self.right_buttons[i].clicked.connect(button_functions[i])
             buttons_layout.addWidget(self.right_buttons[i], 0, i, 1, 1)
 
+        self.search_bar = QLineEdit(self)
+        self.search_bar.setClearButtonEnabled(True)
+        lang.bind(self.search_bar, "setPlaceholderText", "gui.search")
+        self.search_bar.textChanged.connect(self.search)
+
         self.generate_list_of_tasks()
 
         self.dark_mode_button = QPushButton(self)
         self.dark_mode_button.setIconSize(QtCore.QSize(100, 100))
         self.dark_mode_button.resize(50, 90)
-        self.dark_mode_button.setStyleSheet("background-color: rgba(255, 255, 255, 0);border: none;")
+        self.dark_mode_button.setObjectName("tool_button")
 
         buttons_layout.setSpacing(10)
         buttons_layout.setContentsMargins(10, 0, 10, 7)
         last_row = self.grid_layout.rowCount()
         self.grid_layout.addLayout(buttons_layout, last_row, 2,
                                    alignment=QtCore.Qt.AlignRight | QtCore.Qt.AlignBottom)
+        self.grid_layout.addWidget(self.search_bar, last_row, 1, alignment=QtCore.Qt.AlignBottom)
         self.grid_layout.addWidget(self.dark_mode_button, last_row, 0,
                                    alignment=QtCore.Qt.AlignLeft | QtCore.Qt.AlignBottom)
 
@@ -320,24 +115,104 @@ class Window(QWidget):
 
         self.show()
 
+    @timed
     def on_auto_generate_click(self):
-        topic, okay = QInputDialog.getText(self, "Input", "Input topic for auto-generate")
-        if okay:
-            openai.api_key = app_data["api_key"]
-            self.toaster.showMessage(self, f'Generating task for you on topic "{topic}"', timeout=3000, closable=False)
-
-            self.fetch = OpenAIFetcher()
-            self.fetch.finished.connect(self.show_auto_generated_form)
-            self.fetch.topic = topic
+        dialog = TopicsDialog(self)
+        if not dialog.exec_():
+            return
+        topics = dialog.topics()
+        openai.api_key = app_data["api_key"]
+        if len(topics) > 1:
+            self.start_batch(topics)
+        elif topics:
+            topic = topics[0]
+            self.fetch.cancel()  # an abandoned dialog shouldn't keep its thread running
+            self.fetch = OpenAIFetcher(topic, self)
+            self.streamed_form = None
+            self.fetch.streamed.connect(self.on_answer_streamed)
+            self.fetch.answered.connect(self.show_auto_generated_form)
+            self.fetch.finished.connect(self.fetch.deleteLater)
             self.fetch.start()
+            self.show_waiting(f'Generating task for you on topic "{topic}"')
+
+    def show_waiting(self, message):
+        """Busy indicator with a Cancel button while the current dialog waits for an answer"""
+        self.hide_waiting()
+        self.waiting = QProgressDialog(message, "Cancel", 0, 0, self)
+        self.waiting.setWindowTitle("Auto-generate")
+        self.waiting.setMinimumDuration(500)
+        self.waiting.canceled.connect(self.fetch.cancel)
+        self.waiting.setValue(0)
+
+    def hide_waiting(self):
+        if self.waiting is not None:
+            self.waiting.canceled.disconnect()
+            self.waiting.close()
+            self.waiting.deleteLater()
+            self.waiting = None
+
+    @timed
+    def start_batch(self, topics):
+        batch = BatchGenerator(topics, parent=self)
+        errors = []
+        progress = QProgressDialog(f'Generating tasks for {len(topics)} topics...', "Cancel", 0, len(topics), self)
+        progress.setWindowTitle("Auto-generate")
+        progress.setMinimumDuration(0)
+        progress.canceled.connect(batch.cancel)
+        batch.generated.connect(lambda topic, data: self.add_task_to_board(data))
+        batch.failed.connect(lambda topic, error: errors.append(f'"{topic}": {error}'))
+        batch.progress.connect(lambda done, total: progress.setValue(done))
+        batch.finished.connect(lambda: self.on_batch_finished(batch, progress, errors))
+        self.batches.append(batch)
+        batch.start()
+
+    @timed
+    def on_batch_finished(self, batch, progress, errors):
+        self.batches.remove(batch)
+        batch.deleteLater()
+        progress.canceled.disconnect()
+        progress.close()
+        progress.deleteLater()
+        created = len(batch.topics) - len(errors)
+        self.toaster.showMessage(self, f'Created {created} of {len(batch.topics)} tasks.')
+        if created:
+            self.autosave(False)
+        if errors:
+            show_dialog("Auto-generate", f"{len(errors)} topics failed:\n\n" + '\n'.join(errors),
+                        QMessageBox.Warning)
 
-    def show_auto_generated_form(self):
-        self.busy = True
-        data = self.fetch.data
-        if self.fetch.result == 'OK':
+    @timed
+    def on_answer_streamed(self, answer):
+        if self.sender() is not self.fetch:
+            return
+        fields = partial_fields(answer)
+        if fields is None:
+            return  # may still be a question
+        if self.streamed_form is None:
+            self.hide_waiting()
+            self.form = self.streamed_form = Form()
+            self.form.create_button.clicked.connect(self.add_new_task)
+            self.form.open()
+        if self.streamed_form.isVisible():
+            self.streamed_form.fill(*fields)
+
+    @timed
+    def show_auto_generated_form(self, result, data):
+        if self.sender() is not self.fetch:
+            return  # answer from a dialog that was replaced by a newer one
+        self.hide_waiting()
+        if result == 'OK':
             self.toaster.showMessage(self, 'Created task for you.')
+            if self.streamed_form is not None and self.streamed_form.isVisible():
+                self.streamed_form.fill(data['title'], data['desc'], data['reward'])
+                return  # the streamed form is still in use
+            self.streamed_form = None
             self.show_form_for_add_task(data['title'], data['desc'], data['reward'])
-        elif self.fetch.result == 'REPLY':
+        elif result == 'REPLY':
+            if self.streamed_form is not None:
+                # the first tokens looked like a task, the answer turned out to be a question
+                self.streamed_form.close()
+                self.streamed_form = None
             method = data['method']
             okay, reply = False, ''
             if method == 'gettext':
@@ -346,7 +221,7 @@ class Window(QWidget):
                 yes_or_no = show_dialog("Providing some text to AI", data['message'], QMessageBox.Question,
                                         QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
                 reply = ['Yes', 'No'][yes_or_no == QMessageBox.No]
-                okay = reply != QMessageBox.Cancel
+                okay = yes_or_no != QMessageBox.Cancel
             elif method == 'chooseoption':
                 item, okay = QInputDialog.getItem(self, "Providing some text to AI", data['message'], data['options'])
                 reply = '№' + str(data['options'].index(item) + 1)
@@ -356,68 +231,87 @@ class Window(QWidget):
                                          icon=QtWidgets.QStyle.SP_MessageBoxWarning)
 
             if okay:
-                self.fetch.prev.append(reply)
-                self.fetch.start()
+                self.fetch.replies.put(reply)
+                self.show_waiting("Waiting for the answer...")
+            else:
+                self.fetch.end_dialog()
         else:
-            self.toaster.showMessage(self, 'Something went wrong...\n' + self.fetch.result,
+            self.toaster.showMessage(self, 'Something went wrong...\n' + result,
                                      icon=QtWidgets.QStyle.SP_MessageBoxCritical, timeout=10000, margin=30)
         try:
             del self.form
         except AttributeError:
             pass
-        self.busy = False
 
+    @timed
     def generate_list_of_tasks(self):
-        column_names = [
-            lang["gui.tasks.columns.awaits"],
-            lang["gui.tasks.columns.in_process"],
-            lang["gui.tasks.columns.finished"]]
+        column_names = ["gui.tasks.columns.awaits", "gui.tasks.columns.in_process", "gui.tasks.columns.finished"]
         for x, label_name in enumerate(column_names):
-            scroll_area = QScrollArea()
-            scroll_area.setWidgetResizable(True)
-            scroll_area.setFrameShape(QFrame.NoFrame)
-            list_widget = QWidget()
-
-            scroll_layout = QVBoxLayout()
-            scroll_layout.addWidget(scroll_area)
-
-            list_layout = QVBoxLayout(list_widget)
-
-            str_x = str(x)
-
-            if str_x in app_data["tasks"].keys():
-                for dictionary in app_data["tasks"][str_x]:
-                    label = self.create_task_from_dict(dictionary)
-
-                    list_layout.addWidget(label)
+            model = TaskListModel(x, parent=self)
+            view = TaskListView(model, self.theme, self)
+            delegate = view.itemDelegate()
+            delegate.prev_clicked.connect(self.move_task_left)
+            delegate.next_clicked.connect(self.move_task_right)
+            delegate.delete_clicked.connect(self.on_delete_task)
+            lang.bind(delegate, "set_no_description", "gui.tasks.labels.no_desc")
+            self.models.append(model)
+            self.views.append(view)
 
             spaces = 100
-            label = QLabel(' ' * spaces + label_name + ' ' * spaces)
+            label = QLabel()
+            lang.bind(label, "setText", label_name, lambda text: ' ' * spaces + text + ' ' * spaces)
             label.setAutoFillBackground(True)
             label.setMinimumSize(300, 60)
             label.setFixedHeight(60)
             label.setAlignment(QtCore.Qt.AlignCenter | QtCore.Qt.AlignCenter)
-
-            scroll_area.setWidget(list_widget)
+            label.setObjectName("column_header")
 
             self.grid_layout.addWidget(label, 1, x, alignment=QtCore.Qt.AlignCenter | QtCore.Qt.AlignTop)
-            self.grid_layout.addLayout(scroll_layout, 2, x, alignment=QtCore.Qt.AlignCenter | QtCore.Qt.AlignTop)
+            self.grid_layout.addWidget(view, 2, x)
+
+        # big boards keep loading in chunks after the window is shown
+        columns = [app_data["tasks"].get(str(x), []) for x in range(3)]
+        self.loader = BoardLoader(self.models, self.views, columns, self.create_task_from_dict, self)
+        self.loader.tasks_loaded.connect(self.on_tasks_loaded)
+        self.loader.start()
+
+    @timed
+    def on_tasks_loaded(self, tasks):
+        self.task_index.update((task.id, task) for task in tasks)
+        query = self.search_bar.text()
+        for task in tasks:
+            self.search_index.add(task)
+            if task.deadline is not None and task.column != 2:
+                self.deadlines.schedule(task)
+            if self.matches is not None and self.search_index.matches(task.id, query):
+                self.matches.add(task.id)
+
+    @timed
+    def on_deadlines_due(self, tasks):
+        for view in self.views:
+            view.viewport().update()
+        if len(tasks) == 1:
+            message = lang["gui.tasks.labels.deadline"].format(tasks[0].title)
+        else:
+            message = lang["gui.tasks.labels.overdue"].format(len(tasks))
+        self.toaster.showMessage(self, message, icon=QtWidgets.QStyle.SP_MessageBoxWarning,
+                                 corner=QtCore.Qt.BottomRightCorner, timeout=10000)
 
+    @timed
+    def search(self, query):
+        self.matches = self.search_index.search(query)
+        for view in self.views:
+            view.set_filter(self.matches)
+
+    @timed
     def change_lang(self):
-        primary_ids_count = len(primary_lang.dictionary.keys())
         languages_names = []
         languages_short = []
         languages_full = []
-        for path in os.listdir("langs"):
-            if path.endswith(".txt"):
-                clear_lang = path[:5]
-                new_lang = Lang(clear_lang)
-                lang_name = new_lang["language"]
-                ids_count = len(new_lang.dictionary.keys())
-                languages_names.append(lang_name)
-                languages_short.append(clear_lang)
-                languages_full.append(f"({clear_lang}) {lang_name.capitalize()} "
-                                      f"{round(ids_count / primary_ids_count * 100, 2)}%")
+        for clear_lang, lang_name, coverage in language_index.entries(primary_lang):
+            languages_names.append(lang_name)
+            languages_short.append(clear_lang)
+            languages_full.append(f"({clear_lang}) {lang_name.capitalize()} {coverage}%")
 
         del_index = languages_names.index(lang["language"])
         languages_full.pop(del_index)
@@ -432,11 +326,14 @@ class Window(QWidget):
             if selected_language_index >= del_index: selected_language_index += 1
             app_data["lang"] = languages_short[selected_language_index]
 
-            self.closeEvent(QtGui.QCloseEvent())
-            app.exit(101)
+            self.saver.set_setting("lang", app_data["lang"])
+            self.dirty = True
+            # every bound widget is retranslated in place, tasks are left alone
+            lang.set_language(app_data["lang"])
 
-    def on_delete_task(self):
-        row, column, task = self.get_task_by_sender()
+    @timed
+    def on_delete_task(self, index):
+        row, column, task = self.get_task_by_index(index)
         if column == 2:
             if task.reward is not None:
                 reward_content = lang["gui.tasks.labels.reward.desc"] + ' ' + task.reward
@@ -454,218 +351,236 @@ class Window(QWidget):
                                 QMessageBox.Yes | QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            task.deleteLater()
+            # the dialog runs the event loop, a batch may have put new cards on top meanwhile
+            row, column, task = self.find_task(task.id)
+            self.models[column].remove_task(row)
+            del self.task_index[task.id]
+            self.search_index.remove(task.id)
+            self.deadlines.unschedule(task)
+            self.saver.delete_task(task.id)
+            self.dirty = True
             self.autosave(False)
 
-    def find_task_in_scroll_area(self, target: TaskLabel):
-        for column in range(3):
-            scroll_area = self.grid_layout.itemAtPosition(2, column).itemAt(0).widget()
-            scroll_area: QScrollArea
-            tasks = scroll_area.findChildren(TaskLabel)
-            if target in tasks:
-                return tasks.index(target), column
-        return -1, -1
+    def get_task_by_coordinates(self, row: int, column: int) -> Task:
+        return self.models[column].task(row)
 
-    def get_task_by_coordinates(self, row: int, column: int) -> TaskLabel:
-        created_tasks = self.grid_layout.itemAtPosition(2, column).itemAt(0).widget().findChildren(TaskLabel)
-        return created_tasks[row]
+    def find_task(self, task_id):
+        task = self.task_index[task_id]
+        return self.models[task.column].row_of(task_id), task.column, task
 
+    @timed
     def show_form_for_add_task(self, title='', desc='', reward=''):
         self.form = Form()
-        self.form.title_edit.setText(str(title))
-        self.form.description_edit.setText(str(desc))
-        self.form.reward_edit.setText(str(reward))
+        self.form.fill(title, desc, reward)
         self.form.create_button.clicked.connect(self.add_new_task)
         self.form.exec_()
 
+    @timed
     def add_new_task(self):
         if self.form.title_edit.text() == '':
             show_dialog(lang["warnings.no_title_for_task.name"], lang["warnings.no_title_for_task.desc"],
                         QMessageBox.Warning)
             return
         vals = [self.form.title_edit.text(), self.form.description_edit.toPlainText(),
-                self.form.reward_edit.toPlainText()]
-        keys = ["title", "desc", "reward"]
+                self.form.reward_edit.toPlainText(), self.form.deadline()]
+        keys = ["title", "desc", "reward", "deadline"]
         new_dict = {}
         for index, key in enumerate(keys):
             new_dict[key] = vals[index]
 
-        new_task = self.create_task_from_dict(new_dict)
-        scroll = self.grid_layout.itemAtPosition(2, 0).layout().itemAt(0).widget()
-        scroll.widget().layout().insertWidget(0, new_task)
-        self.redraw_()
+        self.add_task_to_board(new_dict)
         self.autosave(False)
 
-        del self.form
-        self.form = Form()
-
+        del self.form  # a new one is built for the next task
+
+    @timed
+    def add_task_to_board(self, dictionary):
+        """Puts a new task on top of the "awaits" column"""
+        new_task = self.create_task_from_dict(dictionary)
+        self.task_index[new_task.id] = new_task
+        self.search_index.add(new_task)
+        if self.matches is not None and self.search_index.matches(new_task.id, self.search_bar.text()):
+            self.matches.add(new_task.id)
+        self.models[0].insert_task(0, new_task)
+        self.deadlines.schedule(new_task)
+        self.saver.add_task(0, new_task.get_dict_form())
+        self.dirty = True
+        return new_task
+
+    @timed
     def on_theme_switch(self):
         self.dark_mode = not self.dark_mode
-        color_scheme = color_schemes[("light", "dark")[self.dark_mode]]
-        background = '#' + color_scheme["background"]
-        foreground = '#' + color_scheme["foreground"]
-        buttons_col = '#' + color_scheme["buttons"]
-        icon = QtGui.QIcon()
+        if app_data["is_light_theme"] == self.dark_mode:
+            app_data["is_light_theme"] = not self.dark_mode
+            self.saver.set_setting("is_light_theme", app_data["is_light_theme"])
+            self.dirty = True
 
         if self.dark_mode:
-            self.dark_mode_button.setToolTip(lang["tooltips.swap_to_light_theme"])
-            icon.addPixmap(QtGui.QPixmap("icons/tile_buttons/dark_theme.svg"), QtGui.QIcon.Normal, QtGui.QIcon.On)
+            lang.bind(self.dark_mode_button, "setToolTip", "tooltips.swap_to_light_theme")
+            self.button_icons[self.dark_mode_button] = "tile_buttons/dark_theme"
         else:
-            self.dark_mode_button.setToolTip(lang["tooltips.swap_to_dark_theme"])
-            icon.addPixmap(QtGui.QPixmap("icons/tile_buttons/light_theme.svg"), QtGui.QIcon.Normal, QtGui.QIcon.On)
-
-        self.set_object_color(self, background)
-        self.set_object_color(QToolTip, foreground)
-        self.dark_mode_button.setIcon(icon)
+            lang.bind(self.dark_mode_button, "setToolTip", "tooltips.swap_to_dark_theme")
+            self.button_icons[self.dark_mode_button] = "tile_buttons/light_theme"
 
-        buttons = [self.dark_mode_button]
-        buttons.extend(self.right_buttons)
-        for button in buttons:
-            button.setStyleSheet("background-color: rgba(255, 255, 255, 0);border: none;")
-            effect = QtWidgets.QGraphicsColorizeEffect()
-            effect.setColor(QtGui.QColor(buttons_col))
-            button.setGraphicsEffect(effect)
-
-        self.redraw_()
+        # one application stylesheet per theme, task cards follow through the delegates
+        self.theme.apply(("light", "dark")[self.dark_mode])
+        buttons_col = self.theme.current.colors["buttons"]
+        for button, icon_name in self.button_icons.items():
+            button.setIcon(icon_cache.icon(icon_name, buttons_col, button.iconSize().width()))
 
     def create_task_from_dict(self, dictionary):
         keys = dictionary.keys()
         title = dictionary["title"]
-        desc = dictionary["desc"] if "desc" in keys else lang["gui.tasks.labels.no_desc"]
+        desc = dictionary["desc"] if "desc" in keys else None  # painted as "no description" in current language
         column = dictionary["column"] if "column" in keys else 0
         deadline = dictionary["deadline"] if "deadline" in keys else None
         reward = dictionary["reward"] if "reward" in keys else None
         upload_timestamp = dictionary["timestamp"] if "timestamp" in keys else None
+        task_id = dictionary["id"] if "id" in keys else None
+
+        return Task(title, desc, column, deadline, reward, upload_timestamp, task_id)
+
+    def get_task_by_index(self, index):
+        model = index.model()
+        row = index.row()
+        return row, model.column, model.task(row)
 
-        task = TaskLabel(title, desc, column, deadline, reward, upload_timestamp)
-        task.next_button.clicked.connect(self.move_task_right)
-        task.prev_button.clicked.connect(self.move_task_left)
-        task.del_button.clicked.connect(self.on_delete_task)
-
-        return task
-
-    def redraw_(self):
-        color_scheme = color_schemes[("light", "dark")[self.dark_mode]]
-        background = '#' + color_scheme["background"]
-        foreground = '#' + color_scheme["foreground"]
-        buttons_col = '#' + color_scheme["buttons"]
-        label_lower = '#' + color_scheme["label_lower"]
-        label_center = '#' + color_scheme["label_center"]
-        label_upper = '#' + color_scheme["label_upper"]
-        for index in range(3):
-            widget_headers = self.grid_layout.itemAtPosition(1, index).widget()
-            widget_headers.setStyleSheet(f"background-color: {foreground};"
-                                         f"color: {buttons_col};"
-                                         "font-size: 20px;"
-                                         f"border: {background};")
-            created_tasks = self.grid_layout.itemAtPosition(2, index).itemAt(0).widget().findChildren(TaskLabel)
-            for created_task in created_tasks:
-                created_task: TaskLabel
-
-                created_task.upper_frame.setStyleSheet(f"background-color: {label_upper}; border-radius: 3px;")
-                created_task.lower_frame.setStyleSheet(f"background-color: {label_lower}; border-radius: 3px;")
-                created_task.background_rect.setStyleSheet(f"background-color: {label_center};"
-                                                           "padding: 10px 20px; border-radius: 5px;")
-
-                for text_label in [created_task.title_label, created_task.desc_label]:
-                    text_label.setStyleSheet(f"color: {buttons_col};")
-
-                for button in [created_task.next_button, created_task.prev_button, created_task.del_button]:
-                    effect = QtWidgets.QGraphicsColorizeEffect()
-                    effect.setColor(QtGui.QColor(buttons_col))
-                    button.setGraphicsEffect(effect)
-
-    def get_task_by_sender(self):
-        sender = self.sender()
-        task = sender.parent().parent().parent()
-        task: TaskLabel
-        row, column = self.find_task_in_scroll_area(task)
-        return row, column, task
-
-    @staticmethod
-    def set_object_color(subject, color):
-        palette = subject.palette()
-        palette.setColor(QtGui.QPalette.Normal, QtGui.QPalette.Window, QtGui.QColor(color))
-        palette.setColor(QtGui.QPalette.Inactive, QtGui.QPalette.Window, QtGui.QColor(color))
-        subject.setPalette(palette)
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_report:
+            self.startup_report = False
+            print(f"first paint: {(time.perf_counter() - started) * 1000:.0f} ms after main.py started",
+                  file=sys.stderr)
+            QTimer.singleShot(0, self.close)
 
     def closeEvent(self, event):
-        self.save_tasks_to_file()
+        for batch in self.batches:
+            batch.cancel()
+        fetchers = self.findChildren(OpenAIFetcher)  # cancelled earlier ones may still be finishing
+        for fetch in fetchers:
+            fetch.cancel()
+        self.saver.stop()
+        if storage.needs_compaction():
+            # only a compaction at exit reads app_data["tasks"], every change is already stored otherwise
+            self.loader.finish()
+            self.save_tasks_to_file()
+        # a request stuck on the network gives up within the timeouts, so this can't hang forever
+        self.hide()
+        deadline = int(sum(timeouts) * 1000) + 1000
+        for fetch in fetchers:
+            fetch.wait(deadline)
+        for batch in self.batches:
+            batch.wait(deadline)
         event.accept()
 
+    @timed
     def save_tasks_to_file(self):
         app_data["is_light_theme"] = not self.dark_mode
         app_data["tasks"] = {"0": [], "1": [], "2": []}
-        for column in range(3):
-            created_tasks = self.grid_layout.itemAtPosition(2, column).itemAt(0).widget().findChildren(TaskLabel)
-            for created_task in created_tasks:
-                created_task: TaskLabel
-                app_data["tasks"][str(column)].append(created_task.get_dict_form())
-                # print(created_task.get_dict_form(), created_task.column)
-
-    def move_task_left(self):
-        self.move_task_to_n_tiles(n=-1)
-
-    def move_task_right(self):
-        self.move_task_to_n_tiles(n=1)
-
-    def move_task_to_n_tiles(self, n):
-        row, column, task = self.get_task_by_sender()
-        clone = self.create_task_from_dict(task.get_dict_form())
-
-        task.deleteLater()
-        new_column = column + n + 3 if column + n % 3 < 0 else (column + n) % 3
-        scroll = self.grid_layout.itemAtPosition(2, new_column).layout().itemAt(0).widget()
-        scroll: QScrollArea
-        scroll.widget().layout().insertWidget(0, clone)
-
-        clone.column = new_column
-        if clone.column == 2:
-            clone.del_button.setIcon(QIcon("icons/tile_buttons/checkmark.svg"))
-        else:
-            clone.del_button.setIcon(QIcon("icons/tile_buttons/trash.svg"))
-        self.redraw_()
+        for column, model in enumerate(self.models):
+            app_data["tasks"][str(column)] = [task.get_dict_form() for task in model.tasks()]
+
+    def move_task_left(self, index):
+        self.move_task_to_n_tiles(index, n=-1)
+
+    def move_task_right(self, index):
+        self.move_task_to_n_tiles(index, n=1)
+
+    def move_task_to_n_tiles(self, index, n):
+        row, column, task = self.get_task_by_index(index)
+        selection = self.views[column].selectionModel()
+        # arrows on a selected card move the whole selection of its column
+        rows = [selected.row() for selected in selection.selectedIndexes()] if selection.isSelected(index) else [row]
+        self.move_tasks(column, rows, (column + n) % 3)
+
+    @timed
+    def move_tasks(self, column, rows, new_column):
+        tasks = self.models[column].remove_tasks(rows)
+        self.models[new_column].insert_tasks(0, tasks)
+        for task in tasks:
+            # finished tasks don't need reminders
+            if new_column == 2:
+                self.deadlines.unschedule(task)
+            else:
+                self.deadlines.schedule(task)
+        # journal replay puts every moved task on top, so the bottom one goes first
+        for task in reversed(tasks):
+            self.saver.move_task(task.id, new_column)
+        self.dirty = True
 
+    @timed
     def autosave(self, is_auto=True):
+        if is_auto and not self.dirty:
+            return  # nothing changed since the last save
+        self.dirty = False
         now = datetime.now()
         if is_auto:
             self.toaster.showMessage(self, lang["sys.autosave"] + now.strftime(" [%H:%M] [%d/%m]"),
-                                     corner=QtCore.Qt.TopEdge, timeout=800, closable=False)
+                                     corner=QtCore.Qt.TopEdge, timeout=800, closable=False, key="save")
         else:
             self.toaster.showMessage(self, lang["sys.save"] + now.strftime(" [%H:%M] [%d/%m]"),
-                                     corner=QtCore.Qt.TopEdge, timeout=3000, closable=False)
-        self.save_tasks_to_file()
-        with open("data.json", "w", encoding="utf-8") as f:
-            json.dump(app_data, f)
+                                     corner=QtCore.Qt.TopEdge, timeout=3000, closable=False, key="save")
+        # every change is already in the journal, the snapshot is only rewritten once it grows too long
+        if storage.needs_compaction() and self.loader.is_finished():
+            settings = {key: value for key, value in app_data.items() if key != "tasks"}
+            self.saver.save(settings, tuple(tuple(model.tasks()) for model in self.models))
+        else:
+            self.saver.sync()
 
 
 class Form(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
 
-        self.setWindowTitle(lang["gui.titles.data_prompt"])
+        lang.bind(self, "setWindowTitle", "gui.titles.data_prompt")
         self.setWindowIcon(QIcon("icons/gui/gear.svg"))
 
         self.create_widgets()
         self.create_layout()
 
     def create_widgets(self):
-        self.title_label = QLabel(lang["form.title"] + ':')
+        self.title_label = QLabel()
+        lang.bind(self.title_label, "setText", "form.title", lambda text: text + ':')
         self.title_edit = QLineEdit()
 
-        self.description_label = QLabel(lang["form.description"] + ':')
+        self.description_label = QLabel()
+        lang.bind(self.description_label, "setText", "form.description", lambda text: text + ':')
         self.description_edit = QTextEdit()
 
-        self.reward_label = QLabel(lang["form.reward"] + ':')
+        self.reward_label = QLabel()
+        lang.bind(self.reward_label, "setText", "form.reward", lambda text: text + ':')
         self.reward_edit = QTextEdit()
         self.reward_edit.setMinimumHeight(20)
 
-        self.create_button = QPushButton(lang["form.create"], self)
+        self.deadline_check = QCheckBox()
+        lang.bind(self.deadline_check, "setText", "form.deadline", lambda text: text + ':')
+        self.deadline_edit = QDateTimeEdit(QDateTime.currentDateTime().addDays(1))
+        self.deadline_edit.setCalendarPopup(True)
+        self.deadline_edit.setDisplayFormat("dd.MM.yy HH:mm")
+        self.deadline_edit.setEnabled(False)
+        self.deadline_check.toggled.connect(self.deadline_edit.setEnabled)
+
+        self.create_button = QPushButton(self)
+        lang.bind(self.create_button, "setText", "form.create")
         self.create_button.clicked.connect(self.accept)
 
-        self.cancel_button = QPushButton(lang["form.cancel"], self)
+        self.cancel_button = QPushButton(self)
+        lang.bind(self.cancel_button, "setText", "form.cancel")
         self.cancel_button.clicked.connect(self.reject)
 
+    def fill(self, title='', desc='', reward=''):
+        # only changed fields are set, so the cursor of a field being edited stays where it is
+        if self.title_edit.text() != str(title):
+            self.title_edit.setText(str(title))
+        for edit, text in ((self.description_edit, str(desc)), (self.reward_edit, str(reward))):
+            if edit.toPlainText() != text:
+                edit.setPlainText(text)
+
+    def deadline(self):
+        if not self.deadline_check.isChecked():
+            return None
+        return self.deadline_edit.dateTime().toPyDateTime().strftime(deadline_format)
+
     def create_layout(self):
         form_layout = QGridLayout(self)
         form_layout.addWidget(self.title_label, 0, 0)
@@ -674,6 +589,9 @@ class Form(QDialog):
         form_layout.addWidget(self.description_label, 1, 0)
         form_layout.addWidget(self.description_edit, 1, 1)
 
+        form_layout.addWidget(self.deadline_check, 2, 0)
+        form_layout.addWidget(self.deadline_edit, 2, 1)
+
         form_layout.addWidget(self.reward_label, 3, 0)
         form_layout.addWidget(self.reward_edit, 3, 1)
 
@@ -681,44 +599,74 @@ class Form(QDialog):
         form_layout.addWidget(self.cancel_button, 4, 1)
 
 
+class TopicsDialog(QDialog):
+    """Topics for auto-generate, one per line. More than one topic starts a batch"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Input")
+
+        self.label = QLabel("Input topic for auto-generate (one per line for many tasks at once)")
+        self.topics_edit = QTextEdit()
+        self.import_button = QPushButton("Import...", self)
+        self.import_button.clicked.connect(self.import_topics)
+        self.ok_button = QPushButton("OK", self)
+        self.ok_button.clicked.connect(self.accept)
+        self.cancel_button = QPushButton("Cancel", self)
+        self.cancel_button.clicked.connect(self.reject)
+
+        layout = QGridLayout(self)
+        layout.addWidget(self.label, 0, 0, 1, 3)
+        layout.addWidget(self.topics_edit, 1, 0, 1, 3)
+        layout.addWidget(self.import_button, 2, 0)
+        layout.addWidget(self.ok_button, 2, 1)
+        layout.addWidget(self.cancel_button, 2, 2)
+
+    def import_topics(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Import topics", "", "Text files (*.txt);;All files (*)")
+        if path:
+            with open(path, encoding="utf-8") as file:
+                self.topics_edit.append(file.read())
+
+    def topics(self):
+        return [line.strip() for line in self.topics_edit.toPlainText().splitlines() if line.strip()]
+
+
+if __name__ == "__main__" and "--importtime" in sys.argv:
+    from startup import report
+    sys.exit(report(sys.argv))
+
 while __name__ == "__main__":
-    files = os.listdir()
     app = QApplication(sys.argv)
+    monitor = install_profiling(app)  # None unless PROFILE=1
     primary_lang = Lang("ru_RU")
+    storage = create_store()
 
-    if "data.json" not in files:
+    if not storage.exists():
         key, okay = QInputDialog.getText(None, "Proved api key for open ai",
                                          "It can be found: https://beta.openai.com/account/api-keys, for free")
         if not okay: break
-        file = open("data.json", "w")
-        file.write(
-            '{"lang": "en_US", "api_key": "APIKEY", "is_light_theme": false, "tasks": {"0": [{"title": "Example"}]}}'.
-            replace("APIKEY", key))
-        file.close()
-
-    with open("data.json", "r", encoding="utf-8") as f:
-        try:
-            app_data = json.load(f)
-            lang = Lang(app_data["lang"])
-        except ValueError as exception:
-            lang = Lang('en_US')
-            reply = show_dialog('File corruption',
-                                f"File with app's data got corrupted!\nWant to regenerate it??\n\n - {exception} error",
-                                QMessageBox.Critical, QMessageBox.Yes | QMessageBox.No)
-            if reply == QMessageBox.Yes:
-                f.close()
-                os.remove("data.json")
-                del app
-                continue
-            break
+        storage.compact({"lang": "en_US", "api_key": key, "is_light_theme": False,
+                         "tasks": {"0": [{"title": "Example"}]}})
+
+    try:
+        app_data = storage.load()
+        lang = Lang(app_data["lang"])
+    except ValueError as exception:
+        lang = Lang('en_US')
+        reply = show_dialog('File corruption',
+                            f"File with app's data got corrupted!\nWant to regenerate it??\n\n - {exception} error",
+                            QMessageBox.Critical, QMessageBox.Yes | QMessageBox.No)
+        if reply == QMessageBox.Yes:
+            storage.remove()
+            del app
+            continue
+        break
 
     x = Window()
     exit_code = app.exec_()
 
-    with open("data.json", "w", encoding="utf-8") as f:
-        json.dump(app_data, f)
-
-    if exit_code == 101:  # reloading code
-        del app, x
-        continue
+    # every change is already stored, only a long journal is worth folding into the snapshot
+    if storage.needs_compaction():
+        storage.compact(app_data)
+    storage.close()
     sys.exit(exit_code)
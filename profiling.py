@@ -0,0 +1,167 @@
+"""
+Opt-in instrumentation, on with `PROFILE=1`. Timed handlers and storage calls, an event-loop
+lag watchdog and widget counters are written to profile.json every few seconds and on exit.
+Off, `timed` returns functions untouched and nothing else is created.
+"""
+import functools
+import heapq
+import inspect
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from PyQt5 import sip
+from PyQt5.QtCore import QObject, QTimer, QEvent, Qt
+from PyQt5.QtWidgets import QApplication
+
+enabled = os.environ.get("PROFILE", "") not in ("", "0")
+log_path = "profile.json"
+
+
+class Profiler:
+    """Totals per operation and the slowest single calls, shared by all threads"""
+    keep = 50  # slowest calls kept in the log
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}  # name -> [calls, total s, max s]
+        self.slowest = []  # min-heap of (duration, seq, record), the fastest kept call on top
+        self.seq = 0
+        self.recent = None  # (duration, name), the slowest call of the ui thread since the last heartbeat
+
+    def record(self, name, duration, ui_thread=True, **details):
+        with self.lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = [0, 0., 0.]
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            if ui_thread and (self.recent is None or duration > self.recent[0]):
+                self.recent = (duration, name)
+            if len(self.slowest) == self.keep and duration <= self.slowest[0][0]:
+                return
+            self.seq += 1
+            entry = (duration, self.seq, dict(name=name, ms=round(duration * 1000, 2), at=time.time(), **details))
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heapreplace(self.slowest, entry)
+
+    def take_recent(self):
+        with self.lock:
+            recent, self.recent = self.recent, None
+        return recent
+
+    def snapshot(self):
+        with self.lock:
+            operations = {name: {"calls": calls, "total_ms": round(total * 1000, 2),
+                                 "mean_ms": round(total / calls * 1000, 3), "max_ms": round(longest * 1000, 2)}
+                          for name, (calls, total, longest) in sorted(self.stats.items(), key=lambda item: -item[1][1])}
+            slowest = [dict(record, at=datetime.fromtimestamp(record["at"]).isoformat(timespec="milliseconds"))
+                       for _, _, record in sorted(self.slowest, reverse=True)]
+        return {"operations": operations, "slowest": slowest}
+
+
+profiler = Profiler()
+
+
+def timed(function):
+    """
+    Records every call of `function` under its qualified name. Extra positional arguments
+    are dropped the way PyQt drops them for slots, so `clicked(bool)` still fits `on_theme_switch(self)`.
+    """
+    if not enabled:
+        return function
+    parameters = inspect.signature(function).parameters.values()
+    max_args = None if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters) else \
+        sum(parameter.kind in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD) for parameter in parameters)
+    name = function.__qualname__
+    main_thread = threading.main_thread()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args[:max_args], **kwargs)
+        finally:
+            profiler.record(name, time.perf_counter() - started, threading.current_thread() is main_thread)
+    return wrapper
+
+
+class Monitor(QObject):
+    """
+    Heartbeat timer that measures how late the event loop runs it, and counters of widgets
+    created and destroyed. A late beat is logged with the slowest timed call since the previous
+    one, a stall without one went into layout, painting or Qt itself.
+    """
+    heartbeat = 50  # ms
+    stall_after = 100  # ms of lag
+    dump_interval = 5000  # ms
+
+    def __init__(self, app, path=log_path):
+        super().__init__(app)
+        self.path = path
+        self.widgets = set()  # addresses of the counted widgets, reparenting doesn't count twice
+        self.created = 0
+        self.destroyed = 0
+        self.stalls = 0
+        self.max_lag = 0.
+        self.last_beat = time.perf_counter()
+        self.beat = QTimer(self, timeout=self.on_beat)
+        self.beat.setTimerType(Qt.PreciseTimer)
+        self.beat.start(self.heartbeat)
+        self.dumper = QTimer(self, timeout=self.dump)
+        self.dumper.start(self.dump_interval)
+        app.installEventFilter(self)
+        app.aboutToQuit.connect(self.dump)
+
+    def on_beat(self):
+        now = time.perf_counter()
+        lag = now - self.last_beat - self.heartbeat / 1000
+        self.last_beat = now
+        self.max_lag = max(self.max_lag, lag)
+        recent = profiler.take_recent()
+        if lag * 1000 >= self.stall_after:
+            self.stalls += 1
+            culprit = f"{recent[1]} ({recent[0] * 1000:.1f} ms)" if recent else "untimed"
+            profiler.record("event loop lag", lag, ui_thread=False, during=culprit)
+
+    def eventFilter(self, source, event):
+        # children are announced to their parent, top-level widgets are polished before they are shown
+        if event.type() == QEvent.ChildAdded:
+            self.count(event.child())
+        elif event.type() == QEvent.Polish:
+            self.count(source)
+        return False
+
+    def count(self, widget):
+        if not widget.isWidgetType():
+            return
+        address = sip.unwrapinstance(widget)
+        if address in self.widgets:
+            return
+        self.widgets.add(address)
+        self.created += 1
+        widget.destroyed.connect(functools.partial(self.on_destroyed, address))
+
+    def on_destroyed(self, address, _=None):
+        self.widgets.discard(address)
+        self.destroyed += 1
+
+    def dump(self):
+        log = profiler.snapshot()
+        log["event_loop"] = {"heartbeat_ms": self.heartbeat, "max_lag_ms": round(self.max_lag * 1000, 2),
+                             "stalls": self.stalls}
+        log["widgets"] = {"created": self.created, "destroyed": self.destroyed,
+                          "alive": len(QApplication.allWidgets())}
+        with open(self.path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(log, file, indent=2, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def install(app):
+    """Starts the monitor when profiling is on, returns it or None"""
+    return Monitor(app) if enabled else None
@@ -0,0 +1,84 @@
+import re
+
+token_pattern = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return set(token_pattern.findall(text.lower())) if text else set()
+
+
+class SearchIndex:
+    """
+    Inverted index over task titles, descriptions and rewards: key -> ids of the tasks
+    containing it. Keys are the tokens and all their prefixes up to `prefix_length`
+    characters, so a query word is one lookup and a query is one set intersection.
+    Tasks are added and removed one by one, the index is never rebuilt.
+    """
+    prefix_length = 12  # longer query words are checked against the tokens of the candidates
+
+    max_cached_tokens = 50000
+
+    def __init__(self):
+        self.postings = {}  # key -> set of task ids
+        self.keys_of = {}  # task id -> its keys, to remove the task without its text
+        self.token_keys = {}  # token -> its keys, words repeat a lot across tasks
+
+    def token_keys_of(self, token):
+        keys = self.token_keys.get(token)
+        if keys is None:
+            if len(self.token_keys) >= self.max_cached_tokens:
+                self.token_keys.clear()
+            keys = self.token_keys[token] = frozenset(
+                [token] + [token[:length] for length in range(1, min(len(token), self.prefix_length) + 1)])
+        return keys
+
+    def keys(self, *texts):
+        keys = set()
+        for token in tokenize(" ".join(text for text in texts if text)):
+            keys |= self.token_keys_of(token)
+        return keys
+
+    def add(self, task):
+        keys = self.keys(task.title, task.description, task.reward)
+        self.keys_of[task.id] = keys
+        postings = self.postings
+        for key in keys:
+            ids = postings.get(key)
+            if ids is None:
+                ids = postings[key] = set()
+            ids.add(task.id)
+
+    def remove(self, task_id):
+        for key in self.keys_of.pop(task_id, ()):
+            ids = self.postings[key]
+            ids.discard(task_id)
+            if not ids:
+                del self.postings[key]
+
+    def __len__(self):
+        return len(self.keys_of)
+
+    def search(self, query):
+        """Ids of tasks that have a word starting with every word of the query, None for an empty query"""
+        words = tokenize(query)
+        if not words:
+            return None
+        sets = []
+        for word in words:
+            ids = self.postings.get(word[:self.prefix_length])
+            if not ids:
+                return set()
+            sets.append(ids)
+        sets.sort(key=len)  # intersecting walks the smallest set
+        result = sets[0].intersection(*sets[1:])
+        long_words = [word for word in words if len(word) > self.prefix_length]
+        if long_words:
+            result = {task_id for task_id in result if self.has_words(task_id, long_words)}
+        return result
+
+    def has_words(self, task_id, words):
+        keys = self.keys_of.get(task_id, ())
+        return all(word in keys or any(key.startswith(word) for key in keys) for word in words)
+
+    def matches(self, task_id, query):
+        return self.has_words(task_id, tokenize(query))
@@ -0,0 +1,42 @@
+"""
+`python main.py --importtime` starts the app again under `python -X importtime`, closes it
+right after the first paint of the window and prints where the start-up time went.
+"""
+import os
+import subprocess
+import sys
+
+
+def parse_importtime(stderr):
+    """Returns [(self us, cumulative us, depth, module)] and the lines that aren't import timings"""
+    imports, other = [], []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            other.append(line)
+            continue
+        parts = line[len("import time:"):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((int(parts[0]), int(parts[1]), depth, name.strip()))
+    return imports, other
+
+
+def report(argv, top=15):
+    argv = [arg for arg in argv if arg != "--importtime"]
+    env = dict(os.environ, STARTUP_REPORT="1")
+    process = subprocess.run([sys.executable, "-X", "importtime"] + argv, env=env,
+                             stderr=subprocess.PIPE, text=True)
+    imports, other = parse_importtime(process.stderr)
+    for line in other:
+        print(line)
+    print(f"imports: {sum(entry[0] for entry in imports) / 1000:.0f} ms in {len(imports)} modules")
+    print("\nslowest top-level imports (cumulative):")
+    for self_us, cumulative, depth, name in sorted((entry for entry in imports if entry[2] == 0),
+                                                   key=lambda entry: -entry[1])[:top]:
+        print(f"{cumulative / 1000:9.1f} ms  {name}")
+    print("\nslowest modules (self):")
+    for self_us, cumulative, depth, name in sorted(imports, key=lambda entry: -entry[0])[:top]:
+        print(f"{self_us / 1000:9.1f} ms  {name}")
+    return process.returncode
@@ -0,0 +1,380 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from uuid import uuid4
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from profiling import enabled as profiling_enabled, profiler, timed
+
+
+def new_task_id():
+    return uuid4().hex
+
+
+class JournalStore:
+    """
+    Keeps app data as a snapshot (data.json) plus an append-only journal of changes.
+    Every add, move or delete is one short line in the journal, the snapshot is only
+    rewritten when the journal is compacted.
+    """
+    compact_after = 1000  # journal records
+
+    def __init__(self, snapshot_path="data.json", journal_path="data.journal"):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.seq = 0
+        self.journal_length = 0
+        self._journal = None
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path)
+
+    def remove(self):
+        self.close()
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @timed
+    def load(self) -> dict:
+        with open(self.snapshot_path, "r", encoding="utf-8") as f:
+            app_data = json.load(f)
+        self.seq = app_data.pop("journal_seq", 0)
+
+        # column -> {id: task}, oldest first, so adding on top is just an insertion at the end
+        columns = {}
+        missing_ids = False
+        for column, tasks in app_data.get("tasks", {}).items():
+            columns[column] = {}
+            for task in reversed(tasks):
+                if "id" not in task:
+                    task["id"] = new_task_id()
+                    missing_ids = True
+                columns[column][task["id"]] = task
+        columns_of = {task_id: column for column, tasks in columns.items() for task_id in tasks}
+
+        self.journal_length = 0
+        for record in self.read_journal():
+            if record["seq"] <= self.seq:
+                continue  # already in the snapshot
+            self.seq = record["seq"]
+            self.journal_length += 1
+            op = record["op"]
+            if op == "set":
+                app_data[record["key"]] = record["value"]
+            elif op == "add":
+                column = str(record["column"])
+                task = record["task"]
+                columns.setdefault(column, {})[task["id"]] = task
+                columns_of[task["id"]] = column
+            elif op in ("move", "delete"):
+                column = columns_of.pop(record["id"], None)
+                if column is None:
+                    continue
+                task = columns[column].pop(record["id"])
+                if op == "move":
+                    column = str(record["column"])
+                    columns.setdefault(column, {})[record["id"]] = task
+                    columns_of[record["id"]] = column
+
+        app_data["tasks"] = {column: list(reversed(tasks.values())) for column, tasks in columns.items()}
+        if missing_ids:
+            # journal records point at tasks by id, so the snapshot has to know them
+            self.compact(app_data)
+        return app_data
+
+    def read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        good = 0  # bytes up to the end of the last whole record
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn write at the end of the journal, everything after it is lost
+                good += len(line)
+                yield record
+        if good < os.path.getsize(self.journal_path):
+            # cut the torn tail off, records appended after it would be glued to it and lost on the next load
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+
+    def append(self, record: dict):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self.seq += 1
+        record["seq"] = self.seq
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        self.journal_length += 1
+
+    @timed
+    def add_task(self, column, task: dict):
+        self.append({"op": "add", "column": column, "task": task})
+
+    @timed
+    def move_task(self, task_id, column):
+        self.append({"op": "move", "id": task_id, "column": column})
+
+    @timed
+    def delete_task(self, task_id):
+        self.append({"op": "delete", "id": task_id})
+
+    @timed
+    def set_setting(self, key, value):
+        self.append({"op": "set", "key": key, "value": value})
+
+    def needs_compaction(self):
+        return self.journal_length >= self.compact_after
+
+    @timed
+    def sync(self):
+        if self._journal is not None:
+            os.fsync(self._journal.fileno())
+
+    @timed
+    def compact(self, app_data: dict):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(dict(app_data, journal_seq=self.seq), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        # if we crash before truncating, records up to journal_seq are skipped on load
+        self.close()
+        open(self.journal_path, "w").close()
+        self.journal_length = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SQLiteStore:
+    """
+    Keeps tasks as rows of a sqlite database, every add, move or delete is one single-row
+    transaction. Tasks are ordered by `position` inside their column, the highest is on top.
+    An existing data.json (and its journal) is migrated on the first load.
+    """
+    schema = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        board_column INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        title TEXT,
+        description TEXT,
+        reward TEXT,
+        deadline TEXT,
+        timestamp TEXT
+    );
+    CREATE INDEX IF NOT EXISTS tasks_by_position ON tasks (board_column, position);
+    CREATE INDEX IF NOT EXISTS tasks_by_timestamp ON tasks (timestamp);
+    CREATE INDEX IF NOT EXISTS tasks_by_deadline ON tasks (deadline);
+    CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT);
+    """
+    top_position = "(SELECT IFNULL(MAX(position), 0) + 1 FROM tasks WHERE board_column = ?)"
+
+    def __init__(self, path="data.db", legacy=None):
+        self.path = path
+        self.legacy = JournalStore() if legacy is None else legacy
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            # opened on the GUI thread, written from the BackgroundSaver; never used by both at once
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")  # commits are made durable by sync()
+            self._connection.executescript(self.schema)
+        return self._connection
+
+    def exists(self):
+        return os.path.exists(self.path) or self.legacy.exists()
+
+    def remove(self):
+        self.close()
+        for path in (self.path, self.path + "-wal", self.path + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        self.legacy.remove()
+
+    @timed
+    def load(self) -> dict:
+        try:
+            if not os.path.exists(self.path) and self.legacy.exists():
+                self.migrate()
+            settings = self.connection.execute("SELECT key, value FROM settings")
+            app_data = {key: json.loads(value) for key, value in settings}
+            tasks = app_data["tasks"] = {}
+            rows = self.connection.execute("SELECT board_column, id, title, description, reward, deadline, timestamp "
+                                           "FROM tasks ORDER BY board_column, position DESC")
+            for column, task_id, title, desc, reward, deadline, timestamp in rows:
+                tasks.setdefault(str(column), []).append({"id": task_id, "title": title, "desc": desc, "reward": reward,
+                                                          "deadline": deadline, "timestamp": timestamp})
+        except sqlite3.DatabaseError as exception:
+            raise ValueError(str(exception))
+        return app_data
+
+    @timed
+    def migrate(self):
+        self.compact(self.legacy.load())
+        self.legacy.close()
+        # kept next to the database, nothing reads them any more
+        for path in (self.legacy.snapshot_path, self.legacy.journal_path):
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+
+    @timed
+    def add_task(self, column, task: dict):
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO tasks VALUES (?, ?, {}, ?, ?, ?, ?, ?)".format(self.top_position),
+                (task["id"], column, column, task["title"], task.get("desc"), task.get("reward"),
+                 task.get("deadline"), task.get("timestamp")))
+
+    @timed
+    def move_task(self, task_id, column):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE tasks SET board_column = ?, position = {} WHERE id = ?".format(self.top_position),
+                (column, column, task_id))
+
+    @timed
+    def delete_task(self, task_id):
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    @timed
+    def set_setting(self, key, value):
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (key, json.dumps(value)))
+
+    def needs_compaction(self):
+        return False  # rows are updated in place
+
+    @timed
+    def sync(self):
+        self.connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    @timed
+    def compact(self, app_data: dict):
+        """Replaces everything stored with `app_data`, in one transaction"""
+        rows = []
+        for column, tasks in app_data.get("tasks", {}).items():
+            for position, task in enumerate(reversed(tasks), 1):
+                rows.append((task.get("id") or new_task_id(), int(column), position, task["title"], task.get("desc"),
+                             task.get("reward"), task.get("deadline"), task.get("timestamp")))
+        with self.connection:
+            self.connection.execute("DELETE FROM tasks")
+            self.connection.execute("DELETE FROM settings")
+            self.connection.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.connection.executemany("INSERT INTO settings VALUES (?, ?)",
+                                        [(key, json.dumps(value)) for key, value in app_data.items() if key != "tasks"])
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def create_store(backend=None):
+    """"sqlite" (default) or "json", STORAGE_BACKEND picks one when `backend` isn't given"""
+    backend = backend or os.environ.get("STORAGE_BACKEND", "sqlite")
+    if backend == "json":
+        return JournalStore()
+    if backend == "sqlite":
+        return SQLiteStore()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+class BackgroundSaver(QThread):
+    """
+    Runs store writes on its own thread. Requests are queued in order, a burst of
+    snapshot requests is coalesced into the latest one and syncs into a single fsync.
+    """
+    saved = pyqtSignal(float)  # seconds spent on the write
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.durations = deque(maxlen=100)
+        self._condition = threading.Condition()
+        self._queue = []
+        self._sync = False
+        self._stopping = False
+
+    def enqueue(self, function, *args):
+        with self._condition:
+            self._queue.append((function, args))
+            self._condition.notify()
+
+    def add_task(self, column, task: dict):
+        self.enqueue(self.store.add_task, column, task)
+
+    def move_task(self, task_id, column):
+        self.enqueue(self.store.move_task, task_id, column)
+
+    def delete_task(self, task_id):
+        self.enqueue(self.store.delete_task, task_id)
+
+    def set_setting(self, key, value):
+        self.enqueue(self.store.set_setting, key, value)
+
+    def save(self, settings: dict, columns):
+        """`columns` must not change afterwards, tuples of tasks taken from the models are enough"""
+        self.enqueue(self.compact, settings, columns)
+
+    def sync(self):
+        with self._condition:
+            self._sync = True
+            self._condition.notify()
+
+    def compact(self, settings, columns):
+        tasks = {str(column): [task.get_dict_form() for task in column_tasks]
+                 for column, column_tasks in enumerate(columns)}
+        self.store.compact(dict(settings, tasks=tasks))
+
+    def stop(self):
+        if not self.isRunning():
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not (self._queue or self._sync or self._stopping):
+                    self._condition.wait()
+                queue, self._queue = self._queue, []
+                sync, self._sync = self._sync, False
+                stopping = self._stopping
+
+            if queue or sync:
+                started = time.perf_counter()
+                # only the newest snapshot matters, it already includes everything queued before it
+                last_snapshot = max((i for i, (function, _) in enumerate(queue) if function == self.compact),
+                                    default=-1)
+                for i, (function, args) in enumerate(queue):
+                    if function != self.compact or i == last_snapshot:
+                        function(*args)
+                if sync:
+                    self.store.sync()
+                duration = time.perf_counter() - started
+                self.durations.append(duration)
+                if profiling_enabled:
+                    profiler.record("BackgroundSaver.save", duration, ui_thread=False)
+                self.saved.emit(duration)
+
+            if stopping:
+                return
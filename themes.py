@@ -0,0 +1,70 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication
+
+from icons import icon_cache
+from profiling import timed
+
+color_schemes = {
+    "dark": {
+        "buttons": "ffffff",
+        "background": "303138",
+        "foreground": "3C4A4A",
+        "red": "E62763",
+        "green": "60F029",
+
+        "label_lower": "0D4F42",
+        "label_center": "289C85",
+        "label_upper": "287062"
+    },
+    "light": {
+        "buttons": "222222",
+        "background": "E8E7C9",
+        "foreground": "DBDBC3",
+        "red": "E62763",
+        "green": "60F029",
+
+        "label_lower": "B000E6",
+        "label_center": "BB4FDB",
+        "label_upper": "D342FF"
+    },
+}
+
+# widgets pick their rules by object name, so none of them needs its own stylesheet
+stylesheet_template = """
+QWidget#board {{ background-color: #{background}; }}
+QLabel#column_header {{
+    background-color: #{foreground};
+    color: #{buttons};
+    font-size: 20px;
+    border: #{background};
+}}
+QPushButton#tool_button {{ background-color: rgba(255, 255, 255, 0); border: none; }}
+QToolTip {{ background-color: #{foreground}; color: #{buttons}; }}
+"""
+
+
+class Theme:
+    def __init__(self, name, scheme):
+        self.name = name
+        self.scheme = scheme
+        self.colors = {key: QColor('#' + value) for key, value in scheme.items()}
+        self.stylesheet = stylesheet_template.format(**scheme)
+
+
+class ThemeManager(QObject):
+    """Builds every theme once and switches between them with a single application stylesheet"""
+    changed = pyqtSignal(object)
+
+    def __init__(self, schemes=None, parent=None):
+        super().__init__(parent)
+        schemes = color_schemes if schemes is None else schemes
+        self.themes = {name: Theme(name, scheme) for name, scheme in schemes.items()}
+        self.current = None
+
+    @timed
+    def apply(self, name):
+        self.current = self.themes[name]
+        icon_cache.clear()  # tinted for the previous theme
+        QApplication.instance().setStyleSheet(self.current.stylesheet)
+        self.changed.emit(self.current)
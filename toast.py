@@ -1,6 +1,10 @@
+from collections import deque
+
 from PyQt5 import QtCore, QtGui, QtWidgets
 import sys
 
+from profiling import timed
+
 
 class QToaster(QtWidgets.QFrame):
     closed = QtCore.pyqtSignal()
@@ -8,6 +12,11 @@ class QToaster(QtWidgets.QFrame):
     def __init__(self, *args, **kwargs):
         super(QToaster, self).__init__(*args, **kwargs)
         QtWidgets.QHBoxLayout(self)
+        self.pooled = False  # owned by a ToastManager, which reuses it after it is closed
+        self.key = None
+        self.labelIcon = None
+        self.label = None
+        self.closeButton = None
 
         self.setSizePolicy(QtWidgets.QSizePolicy.Maximum,
                            QtWidgets.QSizePolicy.Maximum)
@@ -26,9 +35,6 @@ class QToaster(QtWidgets.QFrame):
             self.opacityEffect = QtWidgets.QGraphicsOpacityEffect(opacity=0)
             self.setGraphicsEffect(self.opacityEffect)
             self.opacityAni = QtCore.QPropertyAnimation(self.opacityEffect, b'opacity')
-            # we have a parent, install an eventFilter so that when it's resized
-            # the notification will be correctly moved to the right corner
-            self.parent().installEventFilter(self)
         else:
             # there's no parent, use the window opacity property, assuming that
             # the window manager supports it; if it doesn't, this won'd do
@@ -95,8 +101,55 @@ class QToaster(QtWidgets.QFrame):
         self.timer.start()
 
     def closeEvent(self, event):
-        # we don't need the notification anymore, delete it!
-        self.deleteLater()
+        if self.parent():
+            self.parent().removeEventFilter(self)
+        if not self.pooled:
+            # we don't need the notification anymore, delete it!
+            self.deleteLater()
+        self.closed.emit()
+
+    def setContent(self, message, icon=QtWidgets.QStyle.SP_MessageBoxInformation, closable=True):
+        """Fills the toaster, its widgets are created once and reused for the next messages"""
+        # use Qt standard icon pixmaps; see:
+        # https://doc.qt.io/qt-5/qstyle.html#StandardPixmap-enum
+        if isinstance(icon, QtWidgets.QStyle.StandardPixmap):
+            if self.labelIcon is None:
+                self.labelIcon = QtWidgets.QLabel()
+                self.layout().insertWidget(0, self.labelIcon)
+            icon = self.style().standardIcon(icon)
+            size = self.style().pixelMetric(QtWidgets.QStyle.PM_SmallIconSize)
+            self.labelIcon.setPixmap(icon.pixmap(size))
+            self.labelIcon.show()
+        elif self.labelIcon is not None:
+            self.labelIcon.hide()
+
+        if self.label is None:
+            self.label = QtWidgets.QLabel()
+            self.layout().addWidget(self.label)
+        self.label.setText(message)
+
+        if closable and self.closeButton is None:
+            self.closeButton = QtWidgets.QToolButton()
+            self.layout().addWidget(self.closeButton)
+            closeIcon = self.style().standardIcon(
+                QtWidgets.QStyle.SP_TitleBarCloseButton)
+            self.closeButton.setIcon(closeIcon)
+            self.closeButton.setAutoRaise(True)
+            self.closeButton.clicked.connect(self.close)
+        if self.closeButton is not None:
+            self.closeButton.setVisible(closable)
+
+        # adjust the size to the new content
+        self.adjustSize()
+
+    def popup(self, timeout):
+        self.timer.setInterval(timeout)
+        self.timer.start()
+        self.raise_()
+        self.show()
+        self.opacityAni.setDirection(self.opacityAni.Forward)
+        self.opacityAni.setDuration(100)
+        self.opacityAni.start()
 
     def resizeEvent(self, event):
         super(QToaster, self).resizeEvent(event)
@@ -154,35 +207,12 @@ class QToaster(QtWidgets.QFrame):
         else:
             self = QToaster(parent)
             parentRect = parent.rect()
+            # install an eventFilter so that when the parent is resized the
+            # notification will be correctly moved to the right corner, it's
+            # removed again when the notification is closed
+            parent.installEventFilter(self)
 
-        self.timer.setInterval(timeout)
-
-        # use Qt standard icon pixmaps; see:
-        # https://doc.qt.io/qt-5/qstyle.html#StandardPixmap-enum
-        if isinstance(icon, QtWidgets.QStyle.StandardPixmap):
-            labelIcon = QtWidgets.QLabel()
-            self.layout().addWidget(labelIcon)
-            icon = self.style().standardIcon(icon)
-            size = self.style().pixelMetric(QtWidgets.QStyle.PM_SmallIconSize)
-            labelIcon.setPixmap(icon.pixmap(size))
-
-        self.label = QtWidgets.QLabel(message)
-        self.layout().addWidget(self.label)
-
-        if closable:
-            self.closeButton = QtWidgets.QToolButton()
-            self.layout().addWidget(self.closeButton)
-            closeIcon = self.style().standardIcon(
-                QtWidgets.QStyle.SP_TitleBarCloseButton)
-            self.closeButton.setIcon(closeIcon)
-            self.closeButton.setAutoRaise(True)
-            self.closeButton.clicked.connect(self.close)
-
-        self.timer.start()
-
-        # raise the widget and adjust its size to the minimum
-        self.raise_()
-        self.adjustSize()
+        self.setContent(message, icon, closable)
 
         self.corner = corner
         self.margin = margin
@@ -204,8 +234,119 @@ class QToaster(QtWidgets.QFrame):
                 parentRect.bottomLeft() + QtCore.QPoint(margin, -margin))
 
         self.setGeometry(geo)
-        self.show()
-        self.opacityAni.start()
+        self.popup(timeout)
+
+
+class ToastManager(QtCore.QObject):
+    """
+    Shows the toasts of one window. Toasters are reused from a small pool, messages are
+    stacked per corner (`max_visible` at a time, the rest wait in a queue) and a message
+    with the same key as one already shown or waiting refreshes it instead of adding another.
+    A single event filter follows the window's size, only while something is shown.
+    """
+    max_visible = 3
+    pool_size = 4
+    spacing = 6
+
+    def __init__(self, parent):
+        super(ToastManager, self).__init__(parent)
+        self.window = parent.window()
+        self.pool = []
+        self.shown = {}  # corner -> toasters, the one closest to the corner first
+        self.queued = {}  # corner -> deque of showMessage arguments
+        self.margins = {}
+        self.filtering = False
+
+    @timed
+    def showMessage(self, parent, message,
+                    icon=QtWidgets.QStyle.SP_MessageBoxInformation,
+                    corner=QtCore.Qt.TopLeftCorner, margin=10, closable=True,
+                    timeout=5000, key=None, **kwargs):
+        """Same arguments as QToaster.showMessage, messages with the same `key` (the text by default) are coalesced"""
+        corner = QtCore.Qt.Corner(corner)
+        key = message if key is None else key
+        content = (message, icon, closable, timeout)
+        for toaster in self.shown.get(corner, ()):
+            if toaster.key == key:
+                toaster.setContent(message, icon, closable)
+                toaster.restore()
+                toaster.timer.setInterval(timeout)
+                toaster.timer.start()
+                self.layoutCorner(corner)
+                return
+        queue = self.queued.setdefault(corner, deque())
+        for i, (queued_key, _, queued_margin) in enumerate(queue):
+            if queued_key == key:
+                queue[i] = (key, content, queued_margin)
+                return
+        if len(self.shown.get(corner, ())) >= self.max_visible:
+            queue.append((key, content, margin))
+            return
+        self.show(corner, key, content, margin)
+
+    def show(self, corner, key, content, margin):
+        message, icon, closable, timeout = content
+        toaster = self.pool.pop() if self.pool else self.createToaster()
+        toaster.key = key
+        toaster.corner = corner
+        toaster.setContent(message, icon, closable)
+        self.margins[corner] = margin
+        self.shown.setdefault(corner, []).append(toaster)
+        if not self.filtering:
+            self.window.installEventFilter(self)
+            self.filtering = True
+        self.layoutCorner(corner)
+        toaster.popup(timeout)
+
+    def createToaster(self):
+        toaster = QToaster(self.window)
+        toaster.pooled = True
+        toaster.closed.connect(lambda: self.onClosed(toaster))
+        return toaster
+
+    def onClosed(self, toaster):
+        corner = toaster.corner
+        if toaster not in self.shown.get(corner, ()):
+            return
+        self.shown[corner].remove(toaster)
+        toaster.key = None
+        if len(self.pool) < self.pool_size:
+            self.pool.append(toaster)
+        else:
+            toaster.deleteLater()
+        queue = self.queued.get(corner)
+        if queue:
+            key, content, margin = queue.popleft()
+            self.show(corner, key, content, margin)
+        else:
+            self.layoutCorner(corner)
+        if self.filtering and not any(self.shown.values()):
+            self.window.removeEventFilter(self)
+            self.filtering = False
+
+    def layoutCorner(self, corner):
+        margin = self.margins.get(corner, 10)
+        rect = self.window.rect()
+        offset = margin
+        for toaster in self.shown.get(corner, ()):
+            geo = toaster.geometry()
+            geo.setSize(toaster.sizeHint())
+            if corner == QtCore.Qt.TopLeftCorner:
+                geo.moveTopLeft(rect.topLeft() + QtCore.QPoint(margin, offset))
+            elif corner == QtCore.Qt.TopRightCorner:
+                geo.moveTopRight(rect.topRight() + QtCore.QPoint(-margin, offset))
+            elif corner == QtCore.Qt.BottomRightCorner:
+                geo.moveBottomRight(rect.bottomRight() + QtCore.QPoint(-margin, -offset))
+            else:
+                geo.moveBottomLeft(rect.bottomLeft() + QtCore.QPoint(margin, -offset))
+            toaster.setGeometry(geo)
+            offset += geo.height() + self.spacing
+
+    def eventFilter(self, source, event):
+        if source == self.window and event.type() == QtCore.QEvent.Resize:
+            for corner in self.shown:
+                self.layoutCorner(corner)
+        return super(ToastManager, self).eventFilter(source, event)
 
 
 class W(QtWidgets.QWidget):
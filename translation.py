@@ -0,0 +1,61 @@
+import os
+import threading
+
+from cache import PersistentLRU
+from lazy import lazy_import
+
+requests = lazy_import("requests")
+
+translate_endpoint = os.environ.get("TRANSLATE_ENDPOINT", "https://translate.google.com/translate_a/single")
+timeouts = (3.05, 10)  # connect, read
+
+
+class TranslationCache(PersistentLRU):
+    """Translations keyed by (text, destination), shared by main.py and auto_langs.py"""
+    def __init__(self, path="translation_cache.json", max_entries=5000):
+        super().__init__(path, max_entries)
+
+    @staticmethod
+    def key(text, destination):
+        return destination + '\t' + text
+
+    def get(self, text, destination):
+        """Returns (translated, source language) or None"""
+        value = self.lookup(self.key(text, destination))
+        return None if value is None else tuple(value)
+
+    def put(self, text, destination, translated, language=None):
+        self.store(self.key(text, destination), [translated, language])
+
+
+translation_cache = TranslationCache()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One keep-alive connection pool for every translate() call, made on the first one"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def translate(text, destination='en'):
+    cached = translation_cache.get(text, destination)
+    if cached is not None:
+        return cached
+    params = {"client": "gtx", "sl": "auto", "tl": destination, "dt": "t", "q": text}
+    response = get_session().get(translate_endpoint, params=params, timeout=timeouts)
+    response.raise_for_status()
+    data = response.json()
+    translated = data[0][0][0].capitalize()
+    language = data[2]
+    translation_cache.put(text, destination, translated, language)
+    translation_cache.save()
+    return translated, language